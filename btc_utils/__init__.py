@@ -0,0 +1,35 @@
+import importlib
+
+# Public name -> submodule. Submodules are only imported on first use, so
+# `import btc_utils` stays cheap and pandas/matplotlib/requests load only for
+# the stages that need them.
+_EXPORTS = {
+    'data': ['CryptoCompareError', 'PricePanel', 'cached_bars', 'fetch_candles', 'get_bars', 'get_candles',
+             'get_crypto_data', 'load_panel', 'make_session', 'sync_candles', 'to_frame'],
+    'store': ['CANDLE_DTYPE', 'PriceStore'],
+    'integrity': ['load_repairs', 'repair_candles', 'repair_store'],
+    'cycles': ['VIEWS', 'compute_cycle_rois', 'compute_roi_matrix', 'compute_roi_panel'],
+    'risk': ['RiskIndexState', 'compute_risk_index', 'risk_bucket', 'risk_index_panel', 'risk_label',
+             'risk_surface', 'rolling_extrema', 'rolling_extrema_sweep', 'trailing_risk_panel'],
+    'backtest': ['allocation_grid', 'backtest', 'dca_backtest', 'equity_curve'],
+    'anchors': ['CycleDetector', 'detect_cycles'],
+    'envelopes': ['CycleAnalytics', 'analyze_cycles', 'cycle_envelope'],
+    'filters': ['despike'],
+    'averages': ['OVERLAYS', 'OverlayState', 'compute_overlay', 'compute_overlay_panel'],
+    'resample': ['BarCache', 'aggregate', 'bar_starts'],
+}
+_MODULES = {name: module for module, names in _EXPORTS.items() for name in names}
+
+__all__ = list(_MODULES)
+
+
+def __getattr__(name):
+    if name not in _MODULES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{_MODULES[name]}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,50 @@
+import argparse
+import importlib
+import sys
+import time
+
+# command -> module whose main() runs it; imported only once the command is known
+COMMANDS = {
+    'risk': 'risk',
+    'roi': 'cycles',
+    'render': 'render',
+    'sweep': 'sweep',
+    'backtest': 'backtest',
+    'serve': 'service',
+    'bench': 'bench',
+}
+# Libraries worth reporting with --timings: they dominate start-up when loaded
+HEAVY_MODULES = ('numpy', 'pandas', 'requests', 'matplotlib', 'matplotlib.pyplot', 'numba')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m btc_utils',
+        description="BTC utilities: `risk` prints the current Risk Index (add --chart to plot it), "
+                    "`roi` draws the cycle ROI charts, `render` writes charts to files, "
+                    "`sweep` evaluates parameter grids, `backtest` scores risk-bucket rules, `serve` answers them over HTTP, "
+                    "`bench` times every stage. Run `<command> -h` for its options.")
+    parser.add_argument('--timings', action='store_true',
+                        help="report import and run time and which heavy libraries were loaded (stderr)")
+    parser.add_argument('command', choices=list(COMMANDS))
+    parser.add_argument('args', nargs=argparse.REMAINDER, help="options of the command")
+    args = parser.parse_args(argv)
+
+    from . import metrics
+
+    start = time.perf_counter()
+    with metrics.stage('import', command=args.command):
+        module = importlib.import_module(f".{COMMANDS[args.command]}", __package__)
+    imported = time.perf_counter()
+    try:
+        with metrics.stage('command', command=args.command):
+            return module.main(args.args)
+    finally:
+        if args.timings:
+            loaded = [name for name in HEAVY_MODULES if name in sys.modules]
+            print(f"⏱️  import {imported - start:.3f}s, run {time.perf_counter() - imported:.3f}s, "
+                  f"loaded: {', '.join(loaded) or 'none'}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
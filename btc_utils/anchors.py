@@ -0,0 +1,62 @@
+import numpy as np
+
+DRAWDOWN_THRESHOLD = 0.75
+
+
+class CycleDetector:
+    """Running all-time-high / drawdown scan that finds cycle peaks and bottoms.
+
+    An ATH becomes a cycle peak once price falls `threshold` (fraction) below
+    it; the cycle bottom is the lowest close until the next ATH, which also
+    closes the cycle. One comparison per close, so the detector can be fed the
+    full history once and then kept up to date candle by candle.
+    """
+
+    def __init__(self, threshold=DRAWDOWN_THRESHOLD):
+        self.threshold = threshold
+        self.cycles = []  # (peak_date, bottom_date) of completed cycles
+        self.ath = -np.inf
+        self.ath_date = None
+        self.low = np.inf
+        self.low_date = None
+        self.confirmed = False
+
+    def update(self, date, price):
+        if np.isnan(price) or price <= 0:
+            return
+        if price > self.ath:
+            if self.confirmed:
+                self.cycles.append((self.ath_date, self.low_date))
+                self.confirmed = False
+            self.ath, self.ath_date = price, date
+            self.low, self.low_date = price, date
+            return
+        if price < self.low:
+            self.low, self.low_date = price, date
+        if not self.confirmed and self.low <= self.ath * (1 - self.threshold):
+            self.confirmed = True
+
+    def extend(self, prices):
+        """Feed a Series of closes in date order"""
+        for date, price in zip(prices.index, prices.to_numpy(dtype=float)):
+            self.update(date, price)
+        return self
+
+    def ath_anchors(self):
+        """{name: (peak, bottom)} with the current ATH as the open last cycle"""
+        anchors = {f"Cycle {k} ({peak.year})": (peak, bottom)
+                   for k, (peak, bottom) in enumerate(self.cycles, start=1)}
+        if self.ath_date is not None:
+            anchors[f"Cycle {len(self.cycles) + 1} ({self.ath_date.year})"] = (self.ath_date, None)
+        return anchors
+
+    def bottom_anchors(self):
+        """{name: (bottom, next peak)} for every completed cycle"""
+        peaks = [peak for peak, _ in self.cycles[1:]] + [self.ath_date]
+        return {f"Cycle {k} ({bottom.year})": (bottom, peak)
+                for k, ((_, bottom), peak) in enumerate(zip(self.cycles, peaks), start=1)}
+
+
+def detect_cycles(prices, threshold=DRAWDOWN_THRESHOLD):
+    """CycleDetector run over a Series of closes"""
+    return CycleDetector(threshold).extend(prices)
@@ -0,0 +1,195 @@
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from .resample import bar_starts, resample_close
+
+# ---------------------------- Pine overlays ----------------------------
+Overlay = namedtuple('Overlay', ['timeframe', 'averages', 'cross'])
+
+OVERLAYS = {
+    # EMA Weekly.pine: EMA 21/50/200/300/400 on weekly bars, 21/50 cross fill
+    'ema_weekly': Overlay(
+        timeframe='week',
+        averages={
+            'EMA 21': ('ema', 21),
+            'EMA 50': ('ema', 50),
+            'EMA 200': ('ema', 200),
+            'EMA 300': ('ema', 300),
+            'EMA 400': ('ema', 400),
+        },
+        cross=('EMA 21', 'EMA 50'),
+    ),
+    # SMA Daily.pine: SMA 50 and, despite its title, an EMA 200
+    'sma_daily': Overlay(
+        timeframe='day',
+        averages={
+            'SMA 50': ('sma', 50),
+            'SMA 200': ('ema', 200),
+        },
+        cross=('SMA 50', 'SMA 200'),
+    ),
+}
+
+
+def weekly_closes(close):
+    """Close of each Monday-to-Sunday week, labelled by its Monday, as TradingView draws weekly bars"""
+    return resample_close(close.dropna(), 'week')
+
+
+# ---------------------------- Batch ----------------------------
+def _by_column(values):
+    """(symbols x dates) or 1-D array -> DataFrame with one column per series"""
+    values = np.asarray(values, dtype=float)
+    return pd.DataFrame(np.atleast_2d(values).T), values.shape
+
+
+def ema(values, length):
+    """Pine ema(): seeded with the first value, alpha = 2 / (length + 1); NaNs hold the last value"""
+    frame, shape = _by_column(values)
+    return frame.ewm(span=length, adjust=False, ignore_na=True).mean().to_numpy().T.reshape(shape)
+
+
+def sma(values, length):
+    """Pine sma(): plain mean of the last `length` values, NaN until there are enough"""
+    frame, shape = _by_column(values)
+    return frame.rolling(length).mean().to_numpy().T.reshape(shape)
+
+
+def crosses(fast, slow):
+    """+1 where fast crosses over slow, -1 where it crosses under, else 0 (Pine crossover/crossunder)"""
+    diff = np.asarray(fast, dtype=float) - np.asarray(slow, dtype=float)
+    previous = np.full_like(diff, np.nan)
+    previous[..., 1:] = diff[..., :-1]
+    return ((diff > 0) & (previous <= 0)).astype(int) - ((diff < 0) & (previous >= 0))
+
+
+def compute_overlay(close, name, timeframe='day'):
+    """Every average of an overlay plus its trend (+1 bull, -1 bear) and cross signals.
+
+    `close` holds bars of `timeframe`. Daily closes are regrouped into the
+    overlay's bars; closes already on the overlay's timeframe (e.g. from
+    get_crypto_data(..., timeframe='week'), read from the BarCache) are used as they are.
+    """
+    overlay = OVERLAYS[name]
+    if timeframe != overlay.timeframe:
+        if timeframe != 'day':
+            raise ValueError(f"{name} needs daily or {overlay.timeframe} closes, got {timeframe!r} bars")
+        close = resample_close(close.dropna(), overlay.timeframe)
+
+    values = close.to_numpy(dtype=float)
+    kernels = {'ema': ema, 'sma': sma}
+    result = pd.DataFrame({label: kernels[kind](values, length)
+                           for label, (kind, length) in overlay.averages.items()}, index=close.index)
+
+    fast, slow = (result[label].to_numpy() for label in overlay.cross)
+    result['Trend'] = np.sign(fast - slow)
+    result['Cross'] = crosses(fast, slow)
+    return result
+
+
+def compute_overlay_panel(panel, name):
+    """compute_overlay for every symbol of a PricePanel: (dates, {label: symbols x bars array})"""
+    overlay = OVERLAYS[name]
+    frame = pd.DataFrame(panel.closes.T.astype(float), index=panel.dates)
+    if overlay.timeframe == 'week':
+        frame = frame.groupby(bar_starts(panel.dates.as_unit('s').asi8, 'week')).last()
+        frame.index = pd.to_datetime(frame.index, unit='s')
+
+    values = frame.to_numpy().T
+    kernels = {'ema': ema, 'sma': sma}
+    result = {label: kernels[kind](values, length) for label, (kind, length) in overlay.averages.items()}
+    fast, slow = (result[label] for label in overlay.cross)
+    result['Trend'] = np.sign(fast - slow)
+    result['Cross'] = crosses(fast, slow)
+    return frame.index, result
+
+
+# ---------------------------- Streaming ----------------------------
+class EMA:
+    """Streaming Pine ema() over one or many symbols, O(1) per update.
+
+    update(x, new_bar=False) revises the still-open bar instead of adding one,
+    which is how a weekly bar is followed through the week.
+    """
+
+    def __init__(self, length, symbols=1):
+        self.alpha = 2 / (length + 1)
+        self._base = np.full(symbols, np.nan)  # value at the previous closed bar
+        self.value = np.full(symbols, np.nan)
+
+    def update(self, x, new_bar=True):
+        x = np.asarray(x, dtype=float)
+        if new_bar:
+            self._base = self.value
+        base = self._base
+        stepped = base + self.alpha * (x - base)
+        self.value = np.where(np.isnan(base), x, np.where(np.isnan(x), base, stepped))
+        return self.value
+
+
+class SMA:
+    """Streaming Pine sma() over one or many symbols, O(1) per update via a ring buffer"""
+
+    def __init__(self, length, symbols=1):
+        self.length = length
+        self._buffer = np.zeros((length, symbols))  # unwritten slots add nothing
+        self._position = -1
+        self._filled = 0
+        self._sum = np.zeros(symbols)
+        self._missing = np.zeros(symbols, dtype=int)
+        self.value = np.full(symbols, np.nan)
+
+    def update(self, x, new_bar=True):
+        x = np.asarray(x, dtype=float)
+        if new_bar or self._position < 0:
+            self._position = (self._position + 1) % self.length
+            self._filled = min(self._filled + 1, self.length)
+
+        old = self._buffer[self._position]
+        self._sum -= np.where(np.isnan(old), 0.0, old)
+        self._missing -= np.isnan(old)
+        self._buffer[self._position] = x
+        self._sum += np.where(np.isnan(x), 0.0, x)
+        self._missing += np.isnan(x)
+
+        complete = (self._filled == self.length) & (self._missing == 0)
+        self.value = np.where(complete, self._sum / self.length, np.nan)
+        return self.value
+
+
+class OverlayState:
+    """Streaming version of compute_overlay for one or many symbols.
+
+    Feed one close per bar of the overlay timeframe (new_bar=True), or revise
+    the open bar with new_bar=False. `update` returns the cross signal per
+    symbol: +1 bull cross, -1 bear cross, 0 none.
+    """
+
+    def __init__(self, name, symbols=1):
+        overlay = OVERLAYS[name]
+        kinds = {'ema': EMA, 'sma': SMA}
+        self.cross_pair = overlay.cross
+        self.averages = {label: kinds[kind](length, symbols)
+                         for label, (kind, length) in overlay.averages.items()}
+        self._base_diff = np.full(symbols, np.nan)
+        self.diff = np.full(symbols, np.nan)
+
+    def update(self, closes, new_bar=True):
+        for average in self.averages.values():
+            average.update(closes, new_bar)
+
+        if new_bar:
+            self._base_diff = self.diff
+        fast, slow = (self.averages[label].value for label in self.cross_pair)
+        self.diff = fast - slow
+        return ((self.diff > 0) & (self._base_diff <= 0)).astype(int) - ((self.diff < 0) & (self._base_diff >= 0))
+
+    @property
+    def values(self):
+        return {label: average.value for label, average in self.averages.items()}
+
+    @property
+    def trend(self):
+        return np.sign(self.diff)
@@ -0,0 +1,295 @@
+import argparse
+import itertools
+import os
+from datetime import datetime
+
+import numpy as np
+
+from . import metrics
+from .risk import (MIN_PERIODS, RISK_LABELS, SMOOTH_DAYS, WINDOW_DAYS, _trailing_smooth, risk_bucket,
+                   rolling_extrema)
+
+FEE = 0.001  # per unit of exposure traded (0.1%)
+DELAY = 1  # closes between the signal and the trade
+DCA_AMOUNT = 100
+DCA_EVERY = 7
+LEVELS = (0, 0.25, 0.5, 0.75, 1)
+# Memory budget of one chunk of the allocation backtest. Scoring a chunk keeps at most
+# CHUNK_ARRAYS float64 arrays of (variants x assets x days) alive at once (see _score_allocations)
+CHUNK_BYTES = 256 * 2 ** 20
+CHUNK_ARRAYS = 3
+NO_SIGNAL = len(RISK_LABELS)  # extra bucket for days without a Risk Index yet
+
+ALLOCATION_COLUMNS = ['window_days', 'smooth_days', 'rule', 'asset', 'total_return', 'cagr',
+                      'max_drawdown', 'sharpe', 'exposure', 'trades', 'vs_hold']
+DCA_COLUMNS = ['window_days', 'smooth_days', 'rule', 'asset', 'invested', 'value', 'multiple',
+               'avg_cost', 'vs_dca']
+
+
+# ---------------------------- Rules ----------------------------
+def allocation_grid(levels=LEVELS, monotone=True):
+    """Every (Very Low ... Very High) tuple of exposure levels, as a (variants x 5) array.
+
+    With `monotone` only rules that never hold more at a higher risk are kept
+    (126 instead of 3125 variants for the default five levels).
+    """
+    rules = np.array(list(itertools.product(levels, repeat=len(RISK_LABELS))), dtype=float)
+    if monotone:
+        rules = rules[(np.diff(rules, axis=1) <= 0).all(axis=1)]
+    return rules
+
+
+def rule_name(rule):
+    """'1/1/0.5/0/0': the value per risk bucket, Very Low first"""
+    return '/'.join(f"{value:g}" for value in rule)
+
+
+def _rule_table(rules, no_signal):
+    """(variants x 6) lookup by bucket, the last column used on days without a signal"""
+    rules = np.atleast_2d(np.asarray(rules, dtype=float))
+    if rules.shape[1] != len(RISK_LABELS):
+        raise ValueError(f"rules need one value per risk bucket ({len(RISK_LABELS)}), got {rules.shape[1]}")
+    return np.hstack([rules, np.full((len(rules), 1), no_signal)])
+
+
+# ---------------------------- Signals ----------------------------
+def _panel(closes):
+    """(assets, float64 closes array of shape assets x dates) from a Series or a dates x assets DataFrame"""
+    if closes.ndim == 1:
+        return [closes.name or 'BTC-USD'], closes.to_numpy(dtype=float)[None, :]
+    return [str(name) for name in closes.columns], closes.to_numpy(dtype=float).T
+
+
+def _signals(values, window_days, smooth_days, min_periods, delay):
+    """Yield (window, smooth, buckets) with the bucket acted on at each close, NO_SIGNAL when unknown.
+
+    The Risk Index is trailing only (see risk.trailing_risk_panel) and is
+    shifted by `delay` closes, so the bucket at day t only uses closes up to t - delay.
+    """
+    for window in window_days:
+        rolling_min, rolling_max = rolling_extrema(values, window, min_periods)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            risk = (values - rolling_min) / (rolling_max - rolling_min)
+        for smooth in smooth_days:
+            smoothed = _trailing_smooth(risk, smooth)
+            buckets = np.full(values.shape, NO_SIGNAL, dtype=np.intp)
+            known = ~np.isnan(smoothed)
+            buckets[known] = risk_bucket(smoothed[known])
+            if delay:
+                buckets[:, delay:] = buckets[:, :-delay]
+                buckets[:, :delay] = NO_SIGNAL
+            yield window, smooth, buckets
+
+
+def _active(values):
+    """Mask of the days from each asset's first close on"""
+    return np.logical_or.accumulate(~np.isnan(values), axis=-1)
+
+
+# ---------------------------- Allocation rules ----------------------------
+def _score_allocations(table, buckets, returns, active, fee):
+    """Metrics of every rule (rows of `table`) on every asset, each (variants x assets).
+
+    The exposure set at close t is table[bucket at t]; it earns the return from
+    t to t + 1 and pays `fee` on the exposure it changed. Equity is the cumulative
+    sum of daily log returns, so every variant and asset is one array operation.
+    """
+    # Operations run in place so that no more than CHUNK_ARRAYS full-size arrays are alive
+    held = table[:, buckets]                                      # variants x assets x days
+    days = active.sum(axis=-1)
+    exposure = held.sum(axis=-1, where=active) / days
+
+    daily = np.diff(held, axis=-1, prepend=0)                     # turnover, then daily returns
+    np.abs(daily, out=daily)
+    trades = np.count_nonzero(daily, axis=-1)
+    daily *= -fee
+    carried = np.multiply(held[..., :-1], returns[:, 1:])
+    del held
+    daily[..., 1:] += carried
+    del carried
+
+    mean = daily.sum(axis=-1) / days
+    std = np.sqrt(np.maximum(np.einsum('...i,...i->...', daily, daily) / days - mean ** 2, 0))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sharpe = mean / std * np.sqrt(365)
+
+    log_equity = np.cumsum(np.log1p(daily, out=daily), axis=-1, out=daily)
+    total = log_equity[..., -1].copy()
+    drawdown = np.maximum(log_equity, 0)
+    np.maximum.accumulate(drawdown, axis=-1, out=drawdown)
+    np.subtract(log_equity, drawdown, out=drawdown)
+    return {
+        'total_return': np.expm1(total),
+        'cagr': np.expm1(total * 365 / days),
+        'max_drawdown': np.expm1(drawdown.min(axis=-1)),
+        'sharpe': sharpe,
+        'exposure': exposure,
+        'trades': trades,
+    }
+
+
+def backtest(closes, rules=None, window_days=(WINDOW_DAYS,), smooth_days=(SMOOTH_DAYS,),
+             min_periods=MIN_PERIODS, fee=FEE, delay=DELAY):
+    """Score exposure-per-risk-bucket rules on one or many assets, as a tidy table.
+
+    `closes` is a Series or a dates x assets DataFrame of daily closes (NaN before
+    an asset is listed). Each rule gives the share of the portfolio held in the
+    asset (0-1) for each bucket, Very Low first, e.g. (1, 1, 0.5, 0, 0) buys in
+    the low buckets and sells in the high ones; partial exposures are rebalanced
+    daily. Days before the Risk Index exists are spent in cash.
+
+    One row per (window_days, smooth_days, rule, asset) with the total return,
+    CAGR, max drawdown, annualized Sharpe, average exposure, number of trades
+    and the return relative to buying and holding from the asset's first close.
+    """
+    import pandas as pd
+
+    rules = allocation_grid() if rules is None else np.atleast_2d(np.asarray(rules, dtype=float))
+    table = _rule_table(rules, 0.0)
+    names = [rule_name(rule) for rule in rules]
+    assets, values = _panel(closes)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = np.zeros(values.shape)
+        returns[:, 1:] = values[:, 1:] / values[:, :-1] - 1
+    returns[~np.isfinite(returns)] = 0
+    active = _active(values)
+    hold = np.expm1(np.log1p(returns).sum(axis=-1))
+
+    chunk = max(CHUNK_BYTES // (CHUNK_ARRAYS * 8 * values.size), 1)
+    frames = []
+    with metrics.stage('backtest', rows=len(table) * values.size * len(window_days) * len(smooth_days)):
+        for window, smooth, buckets in _signals(values, window_days, smooth_days, min_periods, delay):
+            scores = [_score_allocations(table[lo:lo + chunk], buckets, returns, active, fee)
+                      for lo in range(0, len(table), chunk)]
+            columns = {key: np.concatenate([part[key] for part in scores]).ravel() for key in scores[0]}
+            columns['vs_hold'] = (1 + columns['total_return']) / np.tile(1 + hold, len(table)) - 1
+            frames.append(pd.DataFrame({
+                'window_days': window, 'smooth_days': smooth,
+                'rule': np.repeat(names, len(assets)), 'asset': np.tile(assets, len(table)),
+                **columns,
+            }))
+    return pd.concat(frames, ignore_index=True)[ALLOCATION_COLUMNS]
+
+
+def equity_curve(closes, rule, window_days=WINDOW_DAYS, smooth_days=SMOOTH_DAYS,
+                 min_periods=MIN_PERIODS, fee=FEE, delay=DELAY):
+    """Daily equity (starting at 1) of one rule on a Series of closes, for plotting a backtest result"""
+    import pandas as pd
+
+    _, values = _panel(closes)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = np.zeros(values.shape)
+        returns[:, 1:] = values[:, 1:] / values[:, :-1] - 1
+    returns[~np.isfinite(returns)] = 0
+    _, _, buckets = next(_signals(values, [window_days], [smooth_days], min_periods, delay))
+    held = _rule_table(rule, 0.0)[:, buckets][0, 0]
+    daily = -fee * np.abs(np.diff(held, prepend=0))
+    daily[1:] += held[:-1] * returns[0, 1:]
+    return pd.Series(np.exp(np.cumsum(np.log1p(daily))), index=closes.index, name=rule_name(rule))
+
+
+# ---------------------------- DCA rules ----------------------------
+def dca_backtest(closes, rules, amount=DCA_AMOUNT, every=DCA_EVERY, window_days=(WINDOW_DAYS,),
+                 smooth_days=(SMOOTH_DAYS,), min_periods=MIN_PERIODS, delay=DELAY):
+    """Score dollar-cost-averaging rules that scale each buy by the risk bucket, as a tidy table.
+
+    Every `every` days from an asset's first close, a rule buys `amount` times
+    its multiplier for the current bucket (e.g. (3, 2, 1, 0.5, 0)). Nothing is
+    bought before the Risk Index exists, and plain DCA (`amount` on every buy
+    day) is measured over the same days. Units bought only depend on
+    the bucket, so per asset the amount and units bought in each bucket are
+    summed once and every rule is a single matrix product.
+
+    One row per (window_days, smooth_days, rule, asset) with the amount invested,
+    final value, value / invested multiple, average cost and the multiple
+    relative to plain DCA.
+    """
+    import pandas as pd
+
+    rules = np.atleast_2d(np.asarray(rules, dtype=float))
+    if (rules < 0).any():
+        raise ValueError("DCA multipliers must be >= 0")
+    table = _rule_table(rules, 0.0)
+    names = [rule_name(rule) for rule in rules]
+    assets, values = _panel(closes)
+    active = _active(values)
+    buy_days = active & ((np.cumsum(active, axis=-1) - 1) % every == 0) & ~np.isnan(values)
+    last = np.array([row[~np.isnan(row)][-1] if (~np.isnan(row)).any() else np.nan for row in values])
+
+    frames = []
+    with metrics.stage('dca_backtest', rows=values.size * len(window_days) * len(smooth_days)):
+        for window, smooth, buckets in _signals(values, window_days, smooth_days, min_periods, delay):
+            bought = np.zeros((len(assets), NO_SIGNAL + 1))   # buys per asset and bucket
+            units = np.zeros((len(assets), NO_SIGNAL + 1))    # units per `amount` spent
+            for row in range(len(assets)):
+                days = buy_days[row]
+                bought[row] = np.bincount(buckets[row, days], minlength=NO_SIGNAL + 1)
+                units[row] = np.bincount(buckets[row, days], 1 / values[row, days], minlength=NO_SIGNAL + 1)
+            invested = amount * table @ bought.T                 # rules x assets
+            held = amount * table @ units.T
+            with np.errstate(divide='ignore', invalid='ignore'):
+                plain = units[:, :NO_SIGNAL].sum(axis=1) * last / bought[:, :NO_SIGNAL].sum(axis=1)
+                multiple = held * last / invested
+                frames.append(pd.DataFrame({
+                    'window_days': window, 'smooth_days': smooth,
+                    'rule': np.repeat(names, len(assets)), 'asset': np.tile(assets, len(table)),
+                    'invested': invested.ravel(), 'value': (held * last).ravel(),
+                    'multiple': multiple.ravel(), 'avg_cost': (invested / held).ravel(),
+                    'vs_dca': (multiple / plain - 1).ravel(),
+                }))
+    return pd.concat(frames, ignore_index=True)[DCA_COLUMNS]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backtest Risk Index bucket rules over the full history")
+    parser.add_argument('--assets', nargs='+', default=['BTC-USD'], help="pairs like BTC-USD ETH-USD")
+    parser.add_argument('--start', default="2013-01-01", help="first day of history (YYYY-MM-DD)")
+    parser.add_argument('--window-days', nargs='+', type=int, default=[WINDOW_DAYS])
+    parser.add_argument('--smooth-days', nargs='+', type=int, default=[SMOOTH_DAYS])
+    parser.add_argument('--min-periods', type=int, default=MIN_PERIODS)
+    parser.add_argument('--delay', type=int, default=DELAY, help="closes between the signal and the trade")
+    parser.add_argument('--levels', nargs='+', type=float, default=list(LEVELS),
+                        help="exposure levels combined into allocation rules")
+    parser.add_argument('--any-order', action='store_true',
+                        help="also try rules holding more at higher risk")
+    parser.add_argument('--fee', type=float, default=FEE, help="cost per unit of exposure traded")
+    parser.add_argument('--dca', nargs='+', type=float, metavar='MULTIPLIER',
+                        help="DCA instead: buy multipliers combined into rules (e.g. 0 0.5 1 2 3)")
+    parser.add_argument('--amount', type=float, default=DCA_AMOUNT, help="DCA base amount")
+    parser.add_argument('--every', type=int, default=DCA_EVERY, help="days between DCA buys")
+    parser.add_argument('--sort', default=None, help="column to rank by (default: vs_hold / vs_dca)")
+    parser.add_argument('--top', type=int, default=10, help="rows shown per asset")
+    parser.add_argument('--out', help="write the full table to this CSV file")
+    args = parser.parse_args(argv)
+
+    import pandas as pd
+
+    from .data import load_panel
+
+    print("Syncing data from CryptoCompare...")
+    pairs = [tuple(pair.split('-')) for pair in args.assets]
+    panel = load_panel(pairs, args.start, datetime.now().strftime("%Y-%m-%d"))
+    closes = pd.DataFrame(panel.closes.T, index=panel.dates, columns=panel.symbols)
+
+    if args.dca:
+        rules = allocation_grid(sorted(set(args.dca)), monotone=not args.any_order)
+        table = dca_backtest(closes, rules, args.amount, args.every, args.window_days, args.smooth_days,
+                             args.min_periods, args.delay)
+    else:
+        rules = allocation_grid(sorted(set(args.levels)), monotone=not args.any_order)
+        table = backtest(closes, rules, args.window_days, args.smooth_days, args.min_periods, args.fee,
+                         args.delay)
+    print(f"🧪 {len(rules)} rules x {len(args.window_days) * len(args.smooth_days)} parameter sets "
+          f"x {len(panel.symbols)} assets")
+
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        table.to_csv(args.out, index=False)
+        print(f"💾 {len(table)} rows saved to {args.out}")
+    sort = args.sort or ('vs_dca' if args.dca else 'vs_hold')
+    best = table.sort_values(sort, ascending=False).groupby('asset', sort=False).head(args.top)
+    print(best.sort_values(['asset', sort], ascending=[True, False]).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
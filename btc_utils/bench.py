@@ -0,0 +1,230 @@
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from .fixtures import ReplayServer, ReplaySession, load_fixture, synthetic_candles
+
+SIZES = (1_000, 100_000, 1_000_000, 10_000_000)
+MINUTE = 60
+TOLERANCE = 1.25
+NOISE_FLOOR = 0.01  # seconds; timings below this are too noisy to flag
+
+
+# ---------------------------- Stages ----------------------------
+def _granularity(records):
+    """Store granularity matching the candle spacing of a dataset"""
+    from .data import GRANULARITIES
+
+    step = int(np.median(np.diff(records['time']))) if len(records) > 1 else MINUTE
+    return min(GRANULARITIES, key=lambda name: abs(GRANULARITIES[name][1] - step))
+
+
+# Each stage: (largest size it runs at, setup(dataset, resources) -> callable). Setup work is not
+# timed; anything it opens is entered on `resources`, an ExitStack closed once the stage is measured.
+def _fetch_cold(dataset, resources):
+    from .data import fetch_candles
+    from .store import PriceStore
+
+    records = dataset['records']
+    session = ReplaySession(records)
+    first, last = int(records['time'][0]), int(records['time'][-1])
+    granularity = _granularity(records)
+
+    def run():
+        with tempfile.TemporaryDirectory() as root:
+            fetched = fetch_candles('BTC', 'USD', first, last, session, granularity=granularity)
+            PriceStore(root).append('BTC', 'USD', fetched, granularity)
+    return run
+
+
+def _fetch_http(dataset, resources):
+    """fetch_cold over real sockets, against the local API stand-in"""
+    from .data import fetch_candles
+
+    records = dataset['records']
+    first, last = int(records['time'][0]), int(records['time'][-1])
+    granularity = _granularity(records)
+    server = resources.enter_context(ReplayServer(ReplaySession(records)))
+    return lambda: fetch_candles('BTC', 'USD', first, last, base_url=server.url, granularity=granularity)
+
+
+def _fetch_warm(dataset, resources):
+    from .data import sync_candles
+    from .store import PriceStore
+
+    records = dataset['records']
+    granularity = _granularity(records)
+    store = PriceStore(resources.enter_context(tempfile.TemporaryDirectory()))
+    store.append('BTC', 'USD', records, granularity)
+    session = ReplaySession(records)
+    return lambda: sync_candles('BTC', 'USD', store, session, granularity=granularity)
+
+
+def _roi_matrix(dataset, resources):
+    from .cycles import compute_roi_matrix
+
+    close = dataset['close']
+    starts = close.index[np.linspace(0, len(close) - 1, 9).astype(int)]
+    anchors = {f"Cycle {k}": (start, end) for k, (start, end) in enumerate(zip(starts[:-1], starts[1:]))}
+    return lambda: compute_roi_matrix(close, anchors)
+
+
+def _risk_index(dataset, resources):
+    from .risk import compute_risk_index
+
+    return lambda: compute_risk_index(dataset['close'])
+
+
+def _despike(dataset, resources):
+    from .filters import despike
+
+    values = dataset['close'].to_numpy()
+    return lambda: despike(values)
+
+
+def _overlay(dataset, resources):
+    from .averages import compute_overlay
+
+    return lambda: compute_overlay(dataset['close'], 'sma_daily')
+
+
+def _render_risk(dataset, resources):
+    from . import charts
+    from .risk import compute_risk_index
+
+    btc = dataset['close'].to_frame('Close')
+    risk = compute_risk_index(btc['Close'], columns=['Risk_Index_Smooth'])
+    btc['Risk_Index_Smooth'] = risk['Risk_Index_Smooth']
+
+    def run():
+        fig = charts.plot_risk_index(btc, headless=True)
+        fig.savefig(io.BytesIO(), format='png', dpi=charts.RENDER_DPI, facecolor=fig.get_facecolor())
+    return run
+
+
+STAGES = {
+    'fetch_cold': (1_000_000, _fetch_cold),
+    'fetch_http': (100_000, _fetch_http),
+    'fetch_warm': (1_000_000, _fetch_warm),
+    'roi_matrix': (10_000_000, _roi_matrix),
+    'risk_index': (10_000_000, _risk_index),
+    'despike': (10_000_000, _despike),
+    'overlay': (10_000_000, _overlay),
+    'render_risk': (10_000_000, _render_risk),
+}
+
+
+# ---------------------------- Measuring ----------------------------
+def make_dataset(records):
+    """Records -> the inputs every stage draws from"""
+    close = pd.Series(np.asarray(records['close']), index=pd.to_datetime(records['time'], unit='s'))
+    return {'records': records, 'close': close}
+
+
+def synthetic_dataset(n):
+    """n minute candles ending now, so a warm sync has exactly one page to fetch"""
+    end = int(time.time()) // MINUTE * MINUTE
+    return make_dataset(synthetic_candles(n, MINUTE, end - (n - 1) * MINUTE))
+
+
+def measure(run, repeat):
+    """(best wall time in seconds, peak traced memory in bytes) of `run`.
+
+    One untimed call first takes lazy imports and JIT compilation out of the numbers.
+    """
+    run()
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return min(timings), peak
+
+
+def run_suite(datasets, stages=STAGES, repeat=3, report=print):
+    """{'stage@dataset': {'seconds': ..., 'peak_mb': ...}} for every stage that fits each dataset"""
+    results = {}
+    for label, dataset in datasets:
+        for stage in stages:
+            max_size, setup = STAGES[stage]
+            if len(dataset['records']) > max_size:
+                continue
+            with contextlib.ExitStack() as resources:
+                seconds, peak = measure(setup(dataset, resources), repeat)
+            results[f"{stage}@{label}"] = {'seconds': seconds, 'peak_mb': peak / 2 ** 20}
+            report(f"{stage:<12} {label:>10}  {seconds:9.4f} s  {peak / 2 ** 20:9.1f} MB")
+    return results
+
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    """Keys whose time or peak memory grew more than `tolerance` x over the baseline"""
+    regressions = []
+    for key, result in results.items():
+        reference = baseline.get(key)
+        if reference is None:
+            continue
+        for metric in ('seconds', 'peak_mb'):
+            if metric == 'seconds' and result[metric] < NOISE_FLOOR:
+                continue
+            if reference[metric] > 0 and result[metric] > reference[metric] * tolerance:
+                regressions.append((key, metric, reference[metric], result[metric]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time and memory of the fetch, compute and render stages")
+    parser.add_argument('--sizes', nargs='+', type=lambda s: int(float(s)), default=list(SIZES),
+                        help="synthetic series lengths (rows)")
+    parser.add_argument('--fixture', action='append', default=[],
+                        help="recorded candle fixture (JSON) to run as an extra dataset")
+    parser.add_argument('--stages', nargs='+', choices=list(STAGES), default=list(STAGES))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--baseline', default='bench_baseline.json')
+    parser.add_argument('--save', action='store_true', help="store these results as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE,
+                        help="slowdown/memory ratio reported as a regression")
+    args = parser.parse_args(argv)
+
+    datasets = [(f"{size:,}", synthetic_dataset(size)) for size in args.sizes]
+    datasets += [(os.path.basename(path), make_dataset(load_fixture(path))) for path in args.fixture]
+
+    results = run_suite(datasets, args.stages, args.repeat)
+
+    if args.save:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"\nBaseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        return 0
+    with open(args.baseline) as f:
+        regressions = compare(results, json.load(f), args.tolerance)
+    print()
+    for key, metric, before, after in regressions:
+        print(f"⚠️  {key} {metric}: {before:.4f} -> {after:.4f} ({after / before:.2f}x)")
+    print(f"{len(regressions)} regression(s) over {args.tolerance:.2f}x the baseline")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
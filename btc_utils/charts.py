@@ -0,0 +1,206 @@
+import os
+
+import matplotlib
+import matplotlib.style
+import matplotlib.dates as mdates
+import numpy as np
+import pandas as pd
+from matplotlib.collections import LineCollection
+from matplotlib.patches import Rectangle
+from matplotlib.ticker import FuncFormatter
+
+from . import metrics
+from .risk import NO_BUCKET, RISK_COLORS, RISK_THRESHOLDS, risk_bucket
+
+BACKGROUND = '#0a0a0a'
+CYCLE_COLORS = ['#ef4444', "#eae308", '#22c55e', '#3b82f6']
+STYLE = 'dark_background'
+FORMATS = ('png', 'svg', 'webp')
+RENDER_DPI = 150
+
+
+def new_figure(figsize, headless=False):
+    """Figure + axes; headless figures use Agg directly and never touch pyplot"""
+    if headless:
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+
+        fig = Figure(figsize=figsize)
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot()
+    else:
+        import matplotlib.pyplot as plt
+
+        fig, ax = plt.subplots(figsize=figsize)
+    fig.patch.set_facecolor(BACKGROUND)
+    ax.set_facecolor(BACKGROUND)
+    return fig, ax
+
+
+def show():
+    import matplotlib.pyplot as plt
+
+    plt.show()
+
+
+def save_figure(fig, path, dpi=RENDER_DPI):
+    """Write a figure to PNG/SVG/WebP, picking the format from the extension"""
+    fmt = os.path.splitext(path)[1].lstrip('.').lower()
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported chart format {fmt!r}, expected one of {FORMATS}")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with metrics.stage('render', format=fmt) as event:
+        fig.savefig(path, format=fmt, dpi=dpi, facecolor=fig.get_facecolor())
+        event['bytes'] = os.path.getsize(path)
+    return path
+
+
+# ---------------------------- Line building ----------------------------
+def decimate_minmax(x, y, columns):
+    """Keep the first, last, min and max point of each of `columns` equal-width x bins.
+
+    x must be sorted. Past a few points per pixel column this draws the same
+    picture as the full series, so render time stays flat however dense the data.
+    """
+    n = len(x)
+    if n <= 4 * columns:
+        return x, y
+
+    edges = np.searchsorted(x, np.linspace(x[0], x[-1], columns + 1)[1:-1])
+    starts = np.unique(np.concatenate([[0], edges]))
+    counts = np.diff(np.append(starts, n))
+    positions = np.arange(n)
+
+    keep = [starts, starts + counts - 1]
+    for reduce in (np.fmin, np.fmax):
+        extreme = np.repeat(reduce.reduceat(y, starts), counts)
+        first = np.minimum.reduceat(np.where(y == extreme, positions, n), starts)
+        keep.append(first[first < n])
+
+    keep = np.unique(np.concatenate(keep))
+    return x[keep], y[keep]
+
+
+def bucket_runs(points, buckets):
+    """{bucket: [polyline, ...]} splitting (n, 2) points wherever the bucket changes.
+
+    Each run ends on the first point of the next one so the line stays
+    continuous; runs are slices of `points`, not copies.
+    """
+    change = np.flatnonzero(buckets[1:] != buckets[:-1]) + 1
+    starts = np.concatenate([[0], change])
+    ends = np.append(change, len(points) - 1)
+
+    runs = {}
+    for start, end in zip(starts, ends):
+        if end > start:
+            runs.setdefault(int(buckets[start]), []).append(points[start:end + 1])
+    return runs
+
+
+# ---------------------------- ROI charts ----------------------------
+@metrics.timed('plot', chart='cycles')
+@matplotlib.style.context(STYLE)
+def plot_cycles(view, cycles, headless=False):
+    """One line per cycle, x = days from the start anchor, y = price multiple"""
+    fig, ax = new_figure((14, 7), headless)
+    final_rois = []  # Final ROI values for y-axis ticks
+
+    for idx, cycle in enumerate(cycles):
+        final_rois.append(cycle.roi[-1])
+        ax.plot(
+            range(len(cycle.roi)),
+            cycle.roi,
+            label=cycle.name,
+            color=CYCLE_COLORS[idx % len(CYCLE_COLORS)],
+            linewidth=1.5,
+            alpha=0.9
+        )
+
+    def format_roi(value, pos):
+        """Converte moltiplicatore in percentuale"""
+        if view.signed and value >= 1:
+            return f'+{(value - 1) * 100:.0f}%'
+        return f'{(value - 1) * 100:.0f}%'
+
+    if view.log_scale:
+        ax.set_yscale('log')
+    ax.yaxis.set_major_formatter(FuncFormatter(format_roi))
+
+    current_ticks = ax.get_yticks()
+    ax.set_yticks(sorted(set(list(current_ticks) + final_rois)))
+
+    ax.axhline(view.baseline, color='gray', linewidth=0.5, linestyle=':', alpha=0.3)
+    ax.set_title(view.title, fontsize=18, fontweight='bold', color='white', pad=20)
+    ax.set_xlabel(view.xlabel, fontsize=13, color='white')
+    ax.set_ylabel(view.ylabel, fontsize=13, color='white')
+    ax.legend(loc=view.legend_loc, fontsize=11, framealpha=0.9)
+    ax.grid(alpha=0.15, color='gray', linestyle='-', linewidth=0.5)
+
+    if view.ylim is not None:
+        low, high = view.ylim
+        if high is None and final_rois:
+            high = max(final_rois) * 1.15
+        ax.set_ylim(low, high)
+    elif cycles:
+        # Limits from the plotted data, so falling cycles are not cut off or drawn upside down
+        low = min(np.nanmin(cycle.roi) for cycle in cycles)
+        high = max(np.nanmax(cycle.roi) for cycle in cycles)
+        if view.log_scale:
+            ax.set_ylim(low / 1.05, high * 1.05)
+        else:
+            pad = (high - low) * 0.05 or 0.05
+            ax.set_ylim(low - pad, high + pad)
+
+    fig.tight_layout()
+    return fig
+
+
+# ---------------------------- Risk Index chart ----------------------------
+@metrics.timed('plot', chart='risk_index')
+@matplotlib.style.context(STYLE)
+def plot_risk_index(btc, title="BTC Risk Index", headless=False):
+    """Risk_Index_Smooth as a line colored by risk level"""
+    fig, ax = new_figure((16, 7), headless)
+
+    dates_numeric = mdates.date2num(btc.index)
+    risk_values = btc['Risk_Index_Smooth'].to_numpy(dtype=float)
+    dates_numeric, risk_values = decimate_minmax(dates_numeric, risk_values,
+                                                 int(fig.get_figwidth() * RENDER_DPI))
+
+    points = np.column_stack([dates_numeric, risk_values])
+    for bucket, runs in bucket_runs(points, risk_bucket(risk_values)).items():
+        if bucket == NO_BUCKET:
+            continue
+        ax.add_collection(LineCollection(runs, color=RISK_COLORS[bucket], linewidth=2.5, alpha=0.9))
+
+    time_range = (btc.index[-1] - btc.index[0]).days
+    margin_days = pd.Timedelta(days=int(time_range * 0.02))
+    ax.set_xlim(btc.index[0], btc.index[-1] + margin_days)
+    ax.set_ylim(-0.05, 1.05)
+
+    ax.set_yticks([0, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0])
+    ax.set_yticklabels(['0%', '10%', '20%', '30%', '40%', '50%', '60%', '70%', '80%', '90%', '100%'])
+
+    for level in RISK_THRESHOLDS:
+        ax.axhline(level, color='gray', linewidth=0.5, linestyle=':', alpha=0.3)
+
+    ax.set_title(title, fontsize=20, fontweight='bold', color='white', pad=20)
+    ax.set_xlabel("Date", fontsize=13, color='white')
+    ax.set_ylabel("Risk", fontsize=13, color='white')
+    ax.grid(alpha=0.1, color='gray', linestyle='-', linewidth=0.5)
+
+    fig.autofmt_xdate()
+    ax.xaxis.set_major_locator(mdates.YearLocator())
+    ax.xaxis.set_major_formatter(mdates.DateFormatter('%b \'%y'))
+
+    bounds = [0.0] + RISK_THRESHOLDS + [1.0]
+    legend_elements = [
+        Rectangle((0, 0), 1, 1, fc=color, label=f'{low:.1f} - {high:.1f}')
+        for color, low, high in zip(RISK_COLORS, bounds[:-1], bounds[1:])
+    ]
+    ax.legend(handles=legend_elements, loc='upper left', fontsize=10,
+              framealpha=0.9, ncol=5, bbox_to_anchor=(0, -0.08))
+
+    fig.tight_layout()
+    return fig
@@ -0,0 +1,277 @@
+import argparse
+import warnings
+from collections import namedtuple
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from . import metrics
+from .anchors import DRAWDOWN_THRESHOLD, detect_cycles
+from .filters import despike
+
+OUTLIER_WINDOW = 5
+OUTLIER_SIGMA = 3
+# Anchors further than this from the nearest available date point at missing data
+SNAP_TOLERANCE = pd.Timedelta(days=1)
+
+# ---------------------------- Views ----------------------------
+# ylim: (low, high) y-limits, a high of None meaning 15% above the highest final ROI;
+# None derives both from the plotted ROI
+CycleView = namedtuple('CycleView', [
+    'title', 'xlabel', 'ylabel', 'anchors', 'start_fmt', 'end_fmt',
+    'log_scale', 'baseline', 'ylim', 'legend_loc', 'signed',
+])
+
+Cycle = namedtuple('Cycle', ['name', 'start', 'end', 'start_price', 'end_price', 'roi'])
+
+VIEWS = {
+    'ath': CycleView(
+        title="Bitcoin: ROI ATH -> Bottom",
+        xlabel="Days from ATH",
+        ylabel="ROI % from ATH",
+        anchors={
+            "Cycle 1 (2013)": ("2013-11-29", "2015-01-14"),
+            "Cycle 2 (2017)": ("2017-12-17", "2018-12-16"),
+            "Cycle 3 (2021)": ("2021-11-08", "2022-11-09"),
+            "Cycle 4 (2025)": ("2025-10-06", None),
+        },
+        start_fmt="  📈 ATH: ${price:,.2f} at {date}",
+        end_fmt="  📉 Bottom: {roi:.1f}% (${price:,.2f}) after {days} days",
+        log_scale=False,
+        baseline=0.2,
+        ylim=(-0.1, 1.1),
+        legend_loc='lower right',
+        signed=False,
+    ),
+    'bottom': CycleView(
+        title="Bitcoin: ROI Bottom -> ATH",
+        xlabel="Days from Bottom",
+        ylabel="ROI % from Bottom",
+        anchors={
+            "Cycle 1 (2015)": ("2015-01-14", "2017-12-17"),
+            "Cycle 2 (2018)": ("2018-12-16", "2021-11-08"),
+            "Cycle 3 (2022)": ("2022-11-09", "2025-10-06"),
+        },
+        start_fmt="  📉 Bottom: ${price:,.2f} at {date}",
+        end_fmt="  📈 Peak: +{roi:.1f}% (${price:,.2f}) after {days} days",
+        log_scale=True,
+        baseline=1.0,
+        ylim=(0.98, None),
+        legend_loc='upper left',
+        signed=True,
+    ),
+    'halving': CycleView(
+        title="Bitcoin: ROI from Halving to Halving",
+        xlabel="Days from Halving",
+        ylabel="ROI % from Halving",
+        anchors={
+            "Halving 1-2": ("2012-11-28", "2016-07-09"),
+            "Halving 2-3": ("2016-07-09", "2020-05-11"),
+            "Halving 3-4": ("2020-05-11", "2024-04-19"),
+            "Halving 4-5": ("2024-04-19", None),
+        },
+        start_fmt="  🔸 Halving Start: ${price:,.2f} at {date}",
+        end_fmt="  🔹 Cycle End: +{roi:.1f}% (${price:,.2f}) after {days} days",
+        log_scale=True,
+        baseline=1.0,
+        ylim=(0.98, None),
+        legend_loc='upper left',
+        signed=True,
+    ),
+}
+
+
+def custom_view(anchors, log_scale=False):
+    """View over user supplied anchors, labelled generically"""
+    return CycleView(
+        title="Bitcoin: ROI from custom anchors",
+        xlabel="Days from Start",
+        ylabel="ROI % from Start",
+        anchors=anchors,
+        start_fmt="  🔸 Start: ${price:,.2f} at {date}",
+        end_fmt="  🔹 End: {roi:+.1f}% (${price:,.2f}) after {days} days",
+        log_scale=log_scale,
+        baseline=1.0,
+        ylim=None,
+        legend_loc='upper left',
+        signed=True,
+    )
+
+
+# ---------------------------- ROI calculation ----------------------------
+RoiMatrix = namedtuple('RoiMatrix', ['names', 'start', 'end', 'start_price', 'end_price', 'lengths', 'roi'])
+
+
+def snap_to_index(index, dates):
+    """Positions of the days nearest to `dates` in a sorted DatetimeIndex (ties go right)"""
+    dates = pd.DatetimeIndex(dates)
+    right = np.minimum(index.searchsorted(dates), len(index) - 1)
+    left = np.maximum(right - 1, 0)
+    closer_left = (dates - index[left]).to_numpy() < (index[right] - dates).to_numpy()
+    return np.where(closer_left, left, right)
+
+
+def remove_outliers(roi, window=OUTLIER_WINDOW, sigma=OUTLIER_SIGMA):
+    """Replace points further than sigma rolling stds from the rolling median by interpolation.
+
+    A 2-D input is treated as one series per row (NaN padded on the right) and
+    filtered in a single call; padding stays NaN.
+    """
+    return despike(roi, window, sigma)
+
+
+def anchor_positions(index, anchors):
+    """(names, start positions, end positions) of the anchors kept, snapped to `index`.
+
+    Warns when an anchor has to move more than SNAP_TOLERANCE, i.e. its date is
+    missing from the prices (a gap, or before the history starts).
+    """
+    starts = pd.DatetimeIndex([start for start, _ in anchors.values()])
+    ends = pd.DatetimeIndex([index[-1] if end is None else end for _, end in anchors.values()])
+    start_pos = snap_to_index(index, starts)
+    end_pos = snap_to_index(index, ends)
+    keep = end_pos >= start_pos
+    if len(index):
+        far = keep & ((abs(index[start_pos] - starts) > SNAP_TOLERANCE)
+                      | (abs(index[end_pos] - ends) > SNAP_TOLERANCE))
+        if far.any():
+            moved = ', '.join(name for name, k in zip(anchors, far) if k)
+            warnings.warn(f"anchors snapped more than {SNAP_TOLERANCE.days} day(s) to available prices: {moved}",
+                          stacklevel=2)
+    return [name for name, k in zip(anchors, keep) if k], start_pos[keep], end_pos[keep]
+
+
+def roi_rows(values, start_pos, end_pos, window=OUTLIER_WINDOW, sigma=OUTLIER_SIGMA):
+    """(lengths, despiked ROI matrix) of `values` (..., dates) between integer anchor positions"""
+    lengths = end_pos - start_pos + 1
+    offsets = np.arange(lengths.max(initial=0))
+    valid = offsets < lengths[:, None]
+    positions = np.minimum(start_pos[:, None] + offsets, values.shape[-1] - 1)
+
+    roi = values[..., positions] / values[..., start_pos, None]
+    roi[..., ~valid] = np.nan
+    if not len(lengths):  # no cycle left: nothing to filter (and nothing to reshape by)
+        return lengths, roi
+
+    days = roi.shape[-1]
+    return lengths, remove_outliers(roi.reshape(-1, days), window, sigma).reshape(roi.shape)
+
+
+def _roi_matrix(index, values, anchors, window, sigma):
+    """compute_roi_matrix over `values` of shape (..., dates); leading axes carry through"""
+    with metrics.stage('roi', cycles=len(anchors)) as event:
+        names, start_pos, end_pos = anchor_positions(index, anchors)
+        lengths, roi = roi_rows(values, start_pos, end_pos, window, sigma)
+        event['rows'] = values.size
+        return RoiMatrix(names, index[start_pos], index[end_pos], values[..., start_pos],
+                         values[..., end_pos], lengths, roi)
+
+
+def compute_roi_matrix(prices, anchors, window=OUTLIER_WINDOW, sigma=OUTLIER_SIGMA):
+    """ROI of every cycle in `anchors` ({name: (start, end or None)}) as one matrix.
+
+    Row k holds the price multiple of cycle k on each day since its start
+    anchor, NaN padded to the longest cycle. Anchor dates are snapped to the
+    nearest available day; an end of None means "up to the last close".
+    Cycles whose end falls before their start are dropped.
+    """
+    return _roi_matrix(prices.index, prices.to_numpy(dtype=float), anchors, window, sigma)
+
+
+def compute_roi_panel(panel, anchors, window=OUTLIER_WINDOW, sigma=OUTLIER_SIGMA):
+    """compute_roi_matrix for every symbol of a PricePanel at once.
+
+    `roi` has shape (symbols, cycles, days) and the prices (symbols, cycles);
+    a symbol with no close on a start anchor gets an all-NaN row.
+    """
+    return _roi_matrix(panel.dates, panel.closes.astype(float), anchors, window, sigma)
+
+
+def compute_cycle_rois(prices, anchors, window=OUTLIER_WINDOW, sigma=OUTLIER_SIGMA):
+    """Per-cycle view of compute_roi_matrix, each `roi` a row of the shared matrix"""
+    matrix = compute_roi_matrix(prices, anchors, window, sigma)
+    return [
+        Cycle(name, matrix.start[k], matrix.end[k], matrix.start_price[k], matrix.end_price[k],
+              matrix.roi[k, :matrix.lengths[k]])
+        for k, name in enumerate(matrix.names)
+    ]
+
+
+def print_cycles(view, cycles):
+    for cycle in cycles:
+        print(f"\n{cycle.name}")
+        print(view.start_fmt.format(price=cycle.start_price, date=cycle.start.date()))
+        roi = (cycle.end_price / cycle.start_price - 1) * 100
+        print(view.end_fmt.format(roi=roi, price=cycle.end_price, days=len(cycle.roi) - 1))
+
+
+# ---------------------------- CLI ----------------------------
+def parse_anchor(text):
+    """'NAME=START:END' (END may be empty for an open cycle) -> (name, (start, end))"""
+    name, _, dates = text.partition('=')
+    start, _, end = dates.partition(':')
+    if not name or not start:
+        raise argparse.ArgumentTypeError(f"expected NAME=START:END, got {text!r}")
+    return name, (start, end or None)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ROI charts for each market cycle")
+    parser.add_argument('modes', nargs='+', choices=[*VIEWS, 'custom'],
+                        help="views to render, all from a single download")
+    parser.add_argument('--anchor', action='append', type=parse_anchor, default=[],
+                        metavar='NAME=START:END', help="cycle for the custom view (repeatable)")
+    parser.add_argument('--log', action='store_true', help="log y-scale for the custom view")
+    parser.add_argument('--auto', action='store_true',
+                        help="detect the ath/bottom anchors from the prices instead of the built-in dates")
+    parser.add_argument('--threshold', type=float, default=DRAWDOWN_THRESHOLD,
+                        help="drawdown from ATH that confirms a cycle peak, as a fraction (with --auto)")
+    parser.add_argument('--project', action='store_true',
+                        help="compare the open cycle with the median/percentile path of the past ones")
+    args = parser.parse_args(argv)
+
+    if 'custom' in args.modes and not args.anchor:
+        parser.error("the custom view needs at least one --anchor")
+
+    from . import charts
+    from .data import get_crypto_data
+
+    print("Syncing BTC data from CryptoCompare...")
+    current_date = datetime.now().strftime("%Y-%m-%d")
+    btc = get_crypto_data("2012-01-01", current_date)
+    print(f"Data available from {btc.index[0].date()} to {btc.index[-1].date()}")
+    print(f"Total days: {len(btc)}")
+
+    detector = detect_cycles(btc['Close'], args.threshold) if args.auto else None
+
+    plotted = 0
+    for mode in dict.fromkeys(args.modes):
+        view = custom_view(dict(args.anchor), args.log) if mode == 'custom' else VIEWS[mode]
+        if detector is not None and mode == 'ath':
+            view = view._replace(anchors=detector.ath_anchors())
+        elif detector is not None and mode == 'bottom':
+            view = view._replace(anchors=detector.bottom_anchors())
+        cycles = compute_cycle_rois(btc['Close'], view.anchors)
+
+        print(f"\n{'='*60}\n{view.title}")
+        if not cycles:
+            print("\nNo cycles detected" if detector is not None and mode in ('ath', 'bottom')
+                  else "\nNo cycles left (every end anchor is before its start)")
+            continue
+        print_cycles(view, cycles)
+        if args.project:
+            from .envelopes import analyze_cycles, print_projection
+
+            print_projection(analyze_cycles(btc['Close'], view.anchors))
+        charts.plot_cycles(view, cycles)
+        plotted += 1
+
+    print("\n" + "="*60)
+    if plotted:
+        print("📊 Chart generated!")
+        charts.show()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,297 @@
+import json
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+from . import metrics
+from .resample import BarCache, bar_starts
+from .store import CANDLE_DTYPE, PriceStore
+
+# BTC_UTILS_API_URL points every download at another server, e.g. `python -m btc_utils.fixtures serve`
+API_URL = os.environ.get('BTC_UTILS_API_URL', "https://min-api.cryptocompare.com/data/v2")
+PAGE_LIMIT = 2000
+DAY = 86400
+
+# granularity -> (endpoint, candle length in seconds)
+GRANULARITIES = {
+    'day': ('histoday', DAY),
+    'hour': ('histohour', 3600),
+    'minute': ('histominute', 60),
+}
+# CryptoCompare only serves about a week of minute candles
+MINUTE_HISTORY_DAYS = 7
+
+MAX_WORKERS = 4
+RETRIES = 5
+BACKOFF = 1.0
+TIMEOUT = 30
+
+# First day with a BTC/USD print on CryptoCompare; the store always holds history from here.
+HISTORY_START = "2010-07-17"
+
+
+def to_timestamp(date):
+    """'YYYY-MM-DD' -> unix seconds"""
+    return int(datetime.strptime(date, "%Y-%m-%d").timestamp())
+
+
+_CANDLE_FIELDS = frozenset(CANDLE_DTYPE.names)
+
+
+def _candle_hook(obj):
+    """json object_hook: each candle becomes a tuple in CANDLE_DTYPE order, ready to drop in a
+    record array, so a page never sits in memory as a list of dicts"""
+    if _CANDLE_FIELDS.issubset(obj):
+        return tuple(obj[name] for name in CANDLE_DTYPE.names)
+    return obj
+
+
+def _merge_pages(buffer, count):
+    """Sorted, deduplicated candles from a page buffer holding `count` filled slots"""
+    records = buffer[np.argsort(buffer['time'], kind='stable')[:count]]
+    # Pages overlap on their edges: keep the last copy of each candle
+    last = np.append(records['time'][1:] != records['time'][:-1], True)
+    return records[last]
+
+
+class CryptoCompareError(RuntimeError):
+    """The API answered with an error or kept rate limiting past the retry budget"""
+
+
+def make_session(pool_size=MAX_WORKERS):
+    """Keep-alive session whose connection pool matches the fetch concurrency"""
+    import requests
+    import requests.adapters
+
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def page_windows(from_ts, to_ts, step=DAY):
+    """(toTs, limit) for every page of `step`-second candles needed to cover [from_ts, to_ts]"""
+    windows = []
+    current_ts = from_ts
+    while True:
+        page_end = min(current_ts + PAGE_LIMIT * step, to_ts)
+        windows.append((page_end, min(PAGE_LIMIT, max(1, (page_end - current_ts) // step))))
+        current_ts += PAGE_LIMIT * step
+        if current_ts >= to_ts:
+            return windows
+
+
+def _is_rate_limited(response, data):
+    if response.status_code == 429:
+        return True
+    return data is not None and 'rate limit' in str(data.get('Message', '')).lower()
+
+
+def fetch_page(http, url, params, retries=RETRIES, backoff=BACKOFF):
+    """GET one histo page, backing off exponentially while rate limited.
+
+    Returns the candles as tuples of CANDLE_DTYPE fields.
+    """
+    endpoint = url.rsplit('/', 1)[-1]
+    for attempt in range(retries + 1):
+        with metrics.stage('page', endpoint=endpoint) as event:
+            response = http.get(url, params=params, timeout=TIMEOUT)
+            try:
+                data = json.loads(response.content, object_hook=_candle_hook)
+            except ValueError:
+                data = None
+            if not isinstance(data, dict):
+                data = None
+            if metrics.enabled():
+                event['bytes'] = len(response.content)
+                if data is not None and data.get('Response') == 'Success':
+                    event['rows'] = len(data['Data']['Data'])
+
+        if _is_rate_limited(response, data):
+            metrics.count('rate_limited', endpoint=endpoint)
+            if attempt == retries:
+                break
+            time.sleep(backoff * 2 ** attempt)
+            continue
+
+        if data is None or data.get('Response') != 'Success':
+            raise CryptoCompareError(f"{url} {params}: {data if data is not None else response.status_code}")
+        return data['Data']['Data']
+
+    raise CryptoCompareError(f"{url} {params}: still rate limited after {retries} retries")
+
+
+def fetch_candles(fsym, tsym, from_ts, to_ts, session=None, base_url=API_URL,
+                  max_workers=MAX_WORKERS, granularity='day'):
+    """Download candles with open time in [from_ts, to_ts].
+
+    All page windows are known up front, so they are requested in parallel over
+    one pooled session and merged afterwards; any failed page raises instead of
+    returning a partial history. Each page is written straight into its slot of
+    one preallocated record buffer.
+    """
+    endpoint, step = GRANULARITIES[granularity]
+    url = f"{base_url}/{endpoint}"
+    http = session or make_session(max_workers)
+    pages = [{'fsym': fsym, 'tsym': tsym, 'limit': limit, 'toTs': page_end}
+             for page_end, limit in page_windows(from_ts, to_ts, step)]
+
+    # A page holds at most limit + 1 candles; unused slots keep a time that sorts last
+    offsets = np.cumsum([0] + [params['limit'] + 1 for params in pages])
+    buffer = np.empty(offsets[-1], dtype=CANDLE_DTYPE)
+    buffer['time'] = np.iinfo(np.int64).max
+
+    def fetch_into(k):
+        rows = fetch_page(http, url, pages[k])[:offsets[k + 1] - offsets[k]]
+        buffer[offsets[k]:offsets[k] + len(rows)] = rows
+        return len(rows)
+
+    try:
+        if len(pages) == 1:
+            count = fetch_into(0)
+        else:
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(pages))) as pool:
+                count = sum(pool.map(fetch_into, range(len(pages))))
+    finally:
+        if session is None:
+            http.close()
+
+    records = _merge_pages(buffer, count)
+    return records[(records['time'] >= from_ts) & (records['time'] <= to_ts)]
+
+
+def sync_candles(fsym='BTC', tsym='USD', store=None, session=None, base_url=API_URL,
+                 granularity='day', repair=True):
+    """Bring the local store up to date and return every stored candle (memory-mapped).
+
+    A cold store downloads the full history; a warm one only asks for the
+    candles from the last stored one onwards, usually a single small request.
+    With `repair`, the new candles are checked against the candle grid first
+    (gaps, zero closes, spikes; see integrity.repair_candles) and every change
+    is logged next to the store file.
+    """
+    store = store or PriceStore()
+    now = int(time.time())
+    last_ts = store.last_timestamp(fsym, tsym, granularity)
+    metrics.count('cache', cache='store', result='miss' if last_ts is None else 'hit')
+    if last_ts is not None:
+        from_ts = last_ts
+    elif granularity == 'minute':
+        from_ts = now - MINUTE_HISTORY_DAYS * DAY
+    else:
+        from_ts = to_timestamp(HISTORY_START)
+
+    records = fetch_candles(fsym, tsym, from_ts, now, session, base_url, granularity=granularity)
+    if repair and len(records):
+        from .integrity import log_repairs, repair_candles
+
+        stored = store.load(fsym, tsym, granularity)
+        before = int(np.searchsorted(stored['time'], records['time'][0], side='left'))
+        anchor = stored[before - 1].copy() if before else None
+        del stored
+        records, repairs = repair_candles(records, GRANULARITIES[granularity][1], anchor)
+        log_repairs(store, fsym, tsym, repairs, granularity)
+    store.append(fsym, tsym, records, granularity)
+    return store.load(fsym, tsym, granularity)
+
+
+def get_candles(start_date, end_date, fsym='BTC', tsym='USD', granularity='day', store=None,
+                session=None):
+    """Candles between two dates as a memory-mapped record slice, after a sync.
+
+    Nothing is copied into memory until the slice is read, so minute or hour
+    history can be cut down before it ever reaches pandas.
+    """
+    store = store or PriceStore()
+    sync_candles(fsym, tsym, store, session, granularity=granularity)
+    return store.between(fsym, tsym, to_timestamp(start_date), to_timestamp(end_date) + DAY - 1,
+                         granularity)
+
+
+def get_bars(start_date, end_date, fsym='BTC', tsym='USD', timeframe='week', source='day',
+             store=None, session=None):
+    """OHLC bars of any timeframe between two dates, derived from the synced `source` candles"""
+    store = store or PriceStore()
+    sync_candles(fsym, tsym, store, session, granularity=source)
+    return cached_bars(store, fsym, tsym, timeframe, start_date, end_date, source)
+
+
+def cached_bars(store, fsym, tsym, timeframe, start_date, end_date, source='day'):
+    """The BarCache bars overlapping two dates (the bar holding start_date included), without a sync"""
+    bars = BarCache(store).bars(fsym, tsym, timeframe, source)
+    times = bars['time']
+    first_bar = bar_starts([to_timestamp(start_date)], timeframe)[0]
+    lo = int(np.searchsorted(times, first_bar, side='left'))
+    hi = int(np.searchsorted(times, to_timestamp(end_date) + DAY - 1, side='right'))
+    return bars[lo:hi]
+
+
+def to_frame(records, dtype=np.float64):
+    """Record array -> DataFrame indexed by Date with a single Close column (copied out of any memmap).
+
+    dtype=np.float32 halves the closes and everything computed from them.
+    """
+    import pandas as pd
+
+    df = pd.DataFrame({'Close': np.array(records['close'], dtype=dtype)},
+                      index=pd.to_datetime(records['time'], unit='s'))
+    df.index.name = 'Date'
+    return df
+
+
+def get_crypto_data(start_date, end_date, fsym='BTC', tsym='USD', store=None, session=None,
+                    granularity='day', dtype=np.float64, timeframe=None):
+    """Closes between two dates, served from the local store after a sync.
+
+    With a `timeframe` ('week', 'month', '4h', ...) they are the closes of bars
+    built from the `granularity` candles by the BarCache, which only
+    re-aggregates the newest bar, labelled by the bar open time.
+    """
+    with metrics.stage('get_crypto_data', fsym=fsym, tsym=tsym, granularity=granularity) as event:
+        if timeframe is None:
+            records = get_candles(start_date, end_date, fsym, tsym, granularity, store, session)
+        else:
+            records = get_bars(start_date, end_date, fsym, tsym, timeframe, granularity, store, session)
+        df = to_frame(records, dtype)
+        event['rows'] = len(df)
+    return df
+
+
+# ---------------------------- Panels ----------------------------
+PricePanel = namedtuple('PricePanel', ['dates', 'symbols', 'closes'])
+
+
+def load_panel(pairs, start_date, end_date, store=None, session=None, max_workers=MAX_WORKERS):
+    """Daily closes of many (fsym, tsym) pairs aligned on one date index.
+
+    `closes` is a float32 array of shape (symbols, dates); days a pair has no
+    price for (not listed yet, or a zero close) are NaN. Pairs are synced
+    concurrently over one shared session.
+    """
+    import pandas as pd
+
+    http = session or make_session(max_workers * MAX_WORKERS)
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            all_records = list(pool.map(lambda pair: sync_candles(*pair, store, http), pairs))
+    finally:
+        if session is None:
+            http.close()
+
+    start_ts = to_timestamp(start_date)
+    end_ts = to_timestamp(end_date) + DAY - 1
+    all_records = [records[(records['time'] >= start_ts) & (records['time'] <= end_ts)]
+                   for records in all_records]
+    times = np.unique(np.concatenate([records['time'] for records in all_records]))
+
+    closes = np.full((len(pairs), len(times)), np.nan, dtype=np.float32)
+    for row, records in enumerate(all_records):
+        closes[row, np.searchsorted(times, records['time'])] = records['close']
+    closes[closes <= 0] = np.nan
+
+    return PricePanel(pd.to_datetime(times, unit='s'), [f"{fsym}-{tsym}" for fsym, tsym in pairs], closes)
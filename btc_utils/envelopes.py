@@ -0,0 +1,142 @@
+import warnings
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+
+from .cycles import OUTLIER_SIGMA, OUTLIER_WINDOW, compute_roi_matrix
+
+QUANTILES = (0.1, 0.25, 0.75, 0.9)
+CACHE_SIZE = 32
+
+# Day-by-day statistics of the closed cycles, all arrays indexed by days since the start anchor
+Envelope = namedtuple('Envelope', ['days', 'count', 'mean', 'median', 'quantiles', 'bands'])
+# Where the open cycle stands against the envelope; days_to_end holds each past cycle's
+# length minus the current day (negative once it is outlasted)
+Projection = namedtuple('Projection', [
+    'name', 'day', 'roi', 'deviation', 'rank', 'path',
+    'days_to_end', 'median_days_to_end', 'projected_end',
+])
+CycleAnalysis = namedtuple('CycleAnalysis', ['matrix', 'closed', 'envelope', 'projection'])
+
+
+# ---------------------------- Envelopes ----------------------------
+def cycle_envelope(roi, quantiles=QUANTILES):
+    """Mean, median and quantile bands over the rows of a (cycles x days) NaN-padded ROI matrix.
+
+    `bands` has one row per quantile. Days no cycle reached are NaN.
+    """
+    roi = np.atleast_2d(roi)
+    if not len(roi):
+        empty = np.full(roi.shape[1], np.nan)
+        return Envelope(np.arange(roi.shape[1]), np.zeros(roi.shape[1], dtype=int), empty, empty,
+                        tuple(quantiles), np.full((len(quantiles), roi.shape[1]), np.nan))
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # all-NaN days past the longest cycle
+        mean = np.nanmean(roi, axis=0)
+        median = np.nanmedian(roi, axis=0)
+        bands = np.nanquantile(roi, quantiles, axis=0).reshape(len(quantiles), roi.shape[1])
+    return Envelope(np.arange(roi.shape[1]), (~np.isnan(roi)).sum(axis=0), mean, median,
+                    tuple(quantiles), bands)
+
+
+def project_cycle(matrix, current, closed, envelope):
+    """Projection of cycle `current` (a row of a RoiMatrix) against the `closed` rows"""
+    length = matrix.lengths[current]
+    roi = matrix.roi[current, :length]
+    day = length - 1
+    reference = envelope.median[:length]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        deviation = roi / reference - 1
+    past = matrix.roi[closed, :length]
+    reached = ~np.isnan(past)
+    rank = np.where(reached.any(axis=0),
+                    (past < roi).sum(axis=0) / np.maximum(reached.sum(axis=0), 1), np.nan)
+
+    # Median path from here on, rescaled to start at today's ROI
+    with np.errstate(divide='ignore', invalid='ignore'):
+        path = roi[-1] * envelope.median[day:] / envelope.median[day]
+
+    # Only the past cycles that were still running on this day say anything about what is left
+    days_to_end = matrix.lengths[closed] - 1 - day
+    running = days_to_end[days_to_end > 0]
+    median_days = float(np.median(running)) if len(running) else np.nan
+    projected_end = None
+    if not np.isnan(median_days):
+        import pandas as pd
+
+        projected_end = matrix.end[current] + pd.Timedelta(days=median_days)
+    return Projection(matrix.names[current], day, roi[-1], deviation, rank, path,
+                      dict(zip([matrix.names[k] for k in closed], days_to_end.tolist())),
+                      median_days, projected_end)
+
+
+def analyze_cycles(prices, anchors, quantiles=QUANTILES, window=OUTLIER_WINDOW, sigma=OUTLIER_SIGMA):
+    """Envelope of the closed cycles in `anchors` and the projection of the open one.
+
+    Cycles with an end anchor of None are open (still running); the last of
+    them is projected. With no open cycle `projection` is None.
+    """
+    matrix = compute_roi_matrix(prices, anchors, window, sigma)
+    open_names = {name for name, (_, end) in anchors.items() if end is None}
+    closed = np.array([k for k, name in enumerate(matrix.names) if name not in open_names], dtype=int)
+    current = [k for k, name in enumerate(matrix.names) if name in open_names]
+
+    envelope = cycle_envelope(matrix.roi[closed], quantiles)
+    projection = project_cycle(matrix, current[-1], closed, envelope) if current else None
+    return CycleAnalysis(matrix, [matrix.names[k] for k in closed], envelope, projection)
+
+
+# ---------------------------- Cache ----------------------------
+class CycleAnalytics:
+    """analyze_cycles with an LRU cache per anchor set and parameters.
+
+    A cached result is reused while the price series has the same length, last
+    date and last close, so per-request dashboard queries only recompute after a
+    sync adds or rewrites a close (the open candle changes through the day).
+    """
+
+    def __init__(self, maxsize=CACHE_SIZE):
+        self.maxsize = maxsize
+        self._cache = OrderedDict()
+        self.hits = self.misses = 0
+
+    def analyze(self, prices, anchors, quantiles=QUANTILES, window=OUTLIER_WINDOW, sigma=OUTLIER_SIGMA):
+        last = (prices.index[-1], float(prices.iloc[-1])) if len(prices) else None
+        key = (tuple(anchors.items()), len(prices), last, tuple(quantiles), window, sigma)
+        if key in self._cache:
+            self.hits += 1
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        self.misses += 1
+        result = analyze_cycles(prices, anchors, quantiles, window, sigma)
+        self._cache[key] = result
+        if len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+        return result
+
+    def clear(self):
+        self._cache.clear()
+
+
+def print_projection(analysis):
+    """Where the open cycle stands against the closed ones, in the style of print_cycles"""
+    projection = analysis.projection
+    if projection is None:
+        print("\nNo open cycle to project")
+        return
+    envelope = analysis.envelope
+    day = projection.day
+    print(f"\n📐 {projection.name}, day {day} vs {len(analysis.closed)} past cycles:")
+    print(f"  ROI: {(projection.roi - 1) * 100:+.1f}% | median {(envelope.median[day] - 1) * 100:+.1f}% "
+          f"| mean {(envelope.mean[day] - 1) * 100:+.1f}%")
+    if not np.isnan(projection.rank[day]):
+        print(f"  Deviation from median: {projection.deviation[day] * 100:+.1f}% "
+              f"(above {projection.rank[day] * 100:.0f}% of past cycles on this day)")
+    if projection.projected_end is not None:
+        remaining = ', '.join(f"{days}" for days in projection.days_to_end.values() if days > 0)
+        print(f"  Days to cycle end: {projection.median_days_to_end:.0f} median "
+              f"({remaining}) -> ~{projection.projected_end.date()}")
+    else:
+        print("  Already longer than every past cycle")
@@ -0,0 +1,181 @@
+import importlib.util
+
+import numpy as np
+
+# numba is optional: the NumPy kernel gives the same result, only slower
+HAS_NUMBA = importlib.util.find_spec('numba') is not None
+
+DESPIKE_WINDOW = 5
+DESPIKE_SIGMA = 3
+
+# Points per block in the NumPy kernel
+CHUNK = 1 << 16
+
+
+# ---------------------------- NumPy kernel ----------------------------
+def _outliers_block(rows, padded, window, sigma):
+    """Mask of points further than sigma centered rolling stds from the centered rolling median.
+
+    The window is handled as `window` shifted views of the padded rows, so every
+    step is an elementwise operation; the median comes from an odd-even
+    transposition sorting network on those views.
+    """
+    n = rows.shape[1]
+    shifted = [padded[:, j:j + n] for j in range(window)]
+    valid = [~np.isnan(view) for view in shifted]
+    counts = np.sum(valid, axis=0)
+
+    keys = [np.where(ok, view, np.inf) for ok, view in zip(valid, shifted)]  # NaNs sort last
+    for step in range(window):
+        for j in range(step % 2, window - 1, 2):
+            keys[j], keys[j + 1] = np.minimum(keys[j], keys[j + 1]), np.maximum(keys[j], keys[j + 1])
+    lo = np.clip((counts - 1) // 2, 0, window - 1)
+    hi = np.clip(counts // 2, 0, window - 1)
+    median = 0.5 * (np.choose(lo, keys) + np.choose(hi, keys))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = sum(np.where(ok, view, 0.0) for ok, view in zip(valid, shifted)) / counts
+        squares = sum(np.where(ok, (view - mean) ** 2, 0.0) for ok, view in zip(valid, shifted))
+        std = np.sqrt(squares / (counts - 1))
+        std[counts < 2] = np.nan
+        return np.abs(rows - median) > sigma * std
+
+
+def _outliers_numpy(rows, window, sigma):
+    """_outliers_block over column chunks small enough for the temporaries to stay in cache"""
+    k, n = rows.shape
+    left = window // 2
+    padded = np.full((k, n + window - 1), np.nan)
+    padded[:, left:left + n] = rows
+
+    outliers = np.empty((k, n), dtype=bool)
+    step = max(1, CHUNK // k)
+    for start in range(0, n, step):
+        stop = min(start + step, n)
+        outliers[:, start:stop] = _outliers_block(rows[:, start:stop],
+                                                  padded[:, start:stop + window - 1], window, sigma)
+    return outliers
+
+
+def _fill_numpy(rows, outliers):
+    """Linear interpolation of the outlier points from their nearest non-NaN neighbours"""
+    k, n = rows.shape
+    flat = rows.ravel()
+    spikes = np.flatnonzero(outliers)
+    if len(spikes) == 0:
+        return rows
+    keep = np.flatnonzero(~outliers.ravel() & ~np.isnan(flat))
+    filled = rows.copy()
+    if len(keep) == 0:  # every point flagged: no neighbour to interpolate from
+        filled.ravel()[spikes] = np.nan
+        return filled
+
+    after = np.searchsorted(keep, spikes)
+    prev = keep[np.maximum(after - 1, 0)]
+    nxt = keep[np.minimum(after, len(keep) - 1)]
+    row = spikes // n
+    has_prev = (after > 0) & (prev // n == row)
+    has_next = (after < len(keep)) & (nxt // n == row)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        between = flat[prev] + (flat[nxt] - flat[prev]) * (spikes - prev) / (nxt - prev)
+    # Past the last valid point hold its value; before the first one there is nothing to hold
+    values = np.where(has_next, between, flat[prev])
+    values[~has_prev] = np.nan
+    filled.ravel()[spikes] = values
+    return filled
+
+
+def _despike_numpy(rows, window, sigma):
+    return _fill_numpy(rows, _outliers_numpy(rows, window, sigma))
+
+
+# ---------------------------- Numba kernel ----------------------------
+def _despike_loops(rows, window, sigma):
+    k, n = rows.shape
+    left = window // 2
+    out = rows.copy()
+    outliers = np.zeros(n, dtype=np.bool_)
+    buffer = np.empty(window)
+
+    for r in range(k):
+        for i in range(n):
+            outliers[i] = False
+            x = rows[r, i]
+            if np.isnan(x):
+                continue
+            count = 0
+            total = 0.0
+            for j in range(max(0, i - left), min(n, i - left + window)):
+                value = rows[r, j]
+                if np.isnan(value):
+                    continue
+                slot = count
+                while slot > 0 and buffer[slot - 1] > value:
+                    buffer[slot] = buffer[slot - 1]
+                    slot -= 1
+                buffer[slot] = value
+                count += 1
+                total += value
+            if count < 2:
+                continue
+            median = 0.5 * (buffer[(count - 1) // 2] + buffer[count // 2])
+            mean = total / count
+            variance = 0.0
+            for j in range(count):
+                variance += (buffer[j] - mean) ** 2
+            if abs(x - median) > sigma * np.sqrt(variance / (count - 1)):
+                outliers[i] = True
+                out[r, i] = np.nan
+
+        prev = -1
+        for i in range(n):
+            if outliers[i] or np.isnan(out[r, i]):
+                continue
+            for j in range(prev + 1, i):
+                if outliers[j] and prev >= 0:
+                    out[r, j] = out[r, prev] + (out[r, i] - out[r, prev]) * (j - prev) / (i - prev)
+            prev = i
+        for j in range(max(prev + 1, 0), n):
+            if outliers[j] and prev >= 0:
+                out[r, j] = out[r, prev]
+    return out
+
+
+_despike_numba = None
+
+
+def _numba_kernel():
+    """JIT-compile _despike_loops on first use, so importing this module stays cheap"""
+    global _despike_numba
+    if _despike_numba is None:
+        import numba
+
+        _despike_numba = numba.njit(cache=True)(_despike_loops)
+    return _despike_numba
+
+
+def despike(values, window=DESPIKE_WINDOW, sigma=DESPIKE_SIGMA, engine='auto'):
+    """Replace spikes with a linear interpolation of their neighbours.
+
+    A point is a spike when it lies more than `sigma` centered rolling standard
+    deviations from the centered rolling median over `window` points (edges use
+    the points available). Same result as the pandas rolling/interpolate
+    recipe, on a 1-D array or on every row of a 2-D one; NaNs (e.g. the padding
+    of a cycles x days matrix) are skipped and left in place. `engine` picks
+    'numba' (JIT loops, used by 'auto' when numba is installed) or 'numpy'.
+    """
+    values = np.asarray(values, dtype=float)
+    rows = np.atleast_2d(values)
+    if engine == 'auto':
+        engine = 'numba' if HAS_NUMBA else 'numpy'
+
+    if engine == 'numba':
+        if not HAS_NUMBA:
+            raise ImportError("despike(engine='numba') needs numba installed")
+        result = _numba_kernel()(np.ascontiguousarray(rows), window, float(sigma))
+    elif engine == 'numpy':
+        result = _despike_numpy(rows, window, sigma)
+    else:
+        raise ValueError(f"Unknown despike engine {engine!r}, expected 'auto', 'numba' or 'numpy'")
+    return result.reshape(values.shape)
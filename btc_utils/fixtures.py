@@ -0,0 +1,255 @@
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+import numpy as np
+
+from .store import CANDLE_DTYPE
+
+DAY = 86400
+STEPS = {'histoday': DAY, 'histohour': 3600, 'histominute': 60}
+PAGE_LIMIT = 2000
+RATE_LIMIT_MESSAGE = "You are over your rate limit please upgrade your account!"
+
+
+# ---------------------------- Candle fixtures ----------------------------
+def synthetic_candles(n, step=DAY, start_ts=1279324800, seed=0):
+    """Deterministic geometric random walk of `n` candles starting at 2010-07-17.
+
+    Drift and volatility are per day and scaled to `step`, so minute series stay in range.
+    """
+    rng = np.random.default_rng(seed)
+    scale = step / DAY
+    close = 0.05 * np.exp(np.cumsum(rng.normal(0.0005 * scale, 0.035 * np.sqrt(scale), n)))
+    spread = np.abs(rng.normal(0, 0.02, n))
+
+    records = np.empty(n, dtype=CANDLE_DTYPE)
+    records['time'] = start_ts + step * np.arange(n, dtype=np.int64)
+    records['open'] = np.append(close[0], close[:-1])
+    records['high'] = np.maximum(records['open'], close) * (1 + spread)
+    records['low'] = np.minimum(records['open'], close) * (1 - spread)
+    records['close'] = close
+    records['volumefrom'] = rng.uniform(1e3, 1e5, n)
+    records['volumeto'] = records['volumefrom'] * close
+    return records
+
+
+def save_fixture(path, records):
+    """Write candles as a JSON fixture ({"candles": [[time, open, ..., volumeto], ...]})"""
+    with open(path, 'w') as f:
+        json.dump({'fields': list(CANDLE_DTYPE.names), 'candles': np.asarray(records).tolist()}, f)
+
+
+def load_fixture(path):
+    with open(path) as f:
+        data = json.load(f)
+    return np.array([tuple(row) for row in data['candles']], dtype=CANDLE_DTYPE)
+
+
+# ---------------------------- Replay ----------------------------
+class ReplayResponse:
+    def __init__(self, payload, status_code=200):
+        self.status_code = status_code
+        self._payload = payload
+
+    def json(self):
+        return self._payload
+
+    @property
+    def content(self):
+        return json.dumps(self._payload).encode()
+
+
+class ReplaySession:
+    """Offline stand-in for a requests session that answers histo* calls from recorded candles.
+
+    Pages follow the API: `limit + 1` candles ending at the candle containing
+    `toTs`, clipped to what was recorded; a limit above 2000 is an error.
+    Every `rate_limit_every`-th call is refused with a 429 rate-limit error and
+    `latency` seconds are slept per call, so retries and concurrency can be
+    exercised deterministically.
+    """
+
+    def __init__(self, records, rate_limit_every=None, latency=0.0):
+        self.records = np.asarray(records, dtype=CANDLE_DTYPE)
+        self.rate_limit_every = rate_limit_every
+        self.latency = latency
+        self.calls = 0
+        self.rate_limited = 0
+        self._lock = threading.Lock()
+
+    def page(self, endpoint, params):
+        step = STEPS[endpoint]
+        times = self.records['time']
+        to_ts = int(params.get('toTs', time.time())) // step * step
+        from_ts = to_ts - int(params['limit']) * step
+        lo = int(np.searchsorted(times, from_ts, side='left'))
+        hi = int(np.searchsorted(times, to_ts, side='right'))
+        rows = [dict(zip(CANDLE_DTYPE.names, row)) for row in self.records[lo:hi].tolist()]
+        return {'Response': 'Success', 'Data': {'TimeFrom': from_ts, 'TimeTo': to_ts, 'Data': rows}}
+
+    def respond(self, endpoint, params):
+        """(HTTP status, JSON payload) the API would answer"""
+        with self._lock:
+            self.calls += 1
+            limited = self.rate_limit_every and self.calls % self.rate_limit_every == 0
+            self.rate_limited += bool(limited)
+        if self.latency:
+            time.sleep(self.latency)
+
+        if limited:
+            return 429, {'Response': 'Error', 'Message': RATE_LIMIT_MESSAGE, 'Data': {}}
+        if endpoint not in STEPS:
+            return 404, {'Response': 'Error', 'Message': f"Path does not exist: {endpoint}", 'Data': {}}
+        try:
+            limit = int(params.get('limit', 30))
+        except ValueError:
+            limit = -1
+        if not 0 <= limit <= PAGE_LIMIT:
+            return 200, {'Response': 'Error', 'Message': f"limit param must be 0-{PAGE_LIMIT}", 'Data': {}}
+        if not params.get('fsym') or not params.get('tsym'):
+            return 200, {'Response': 'Error', 'Message': "fsym and tsym params are required", 'Data': {}}
+        return 200, self.page(endpoint, {**params, 'limit': limit})
+
+    def get(self, url, params=None, timeout=None):
+        status, payload = self.respond(url.rstrip('/').rsplit('/', 1)[-1], params or {})
+        return ReplayResponse(payload, status)
+
+    def close(self):
+        pass
+
+
+class RecordingSession:
+    """Wraps a real session and keeps every candle it downloads, to save as a fixture"""
+
+    def __init__(self, session):
+        self.session = session
+        self._pages = []
+        self._lock = threading.Lock()
+
+    def get(self, url, params=None, timeout=None):
+        response = self.session.get(url, params=params, timeout=timeout)
+        try:
+            rows = response.json()['Data']['Data']
+        except (ValueError, KeyError, TypeError):
+            return response
+        page = np.array([tuple(row[name] for name in CANDLE_DTYPE.names) for row in rows],
+                        dtype=CANDLE_DTYPE)
+        with self._lock:
+            self._pages.append(page)
+        return response
+
+    def records(self):
+        """Every recorded candle, sorted and deduplicated"""
+        records = np.concatenate(self._pages) if self._pages else np.empty(0, dtype=CANDLE_DTYPE)
+        records = records[np.argsort(records['time'], kind='stable')]
+        return records[np.append(records['time'][1:] != records['time'][:-1], True)]
+
+    def save(self, path):
+        save_fixture(path, self.records())
+
+    def close(self):
+        self.session.close()
+
+
+# ---------------------------- Local API server ----------------------------
+class ReplayServer(ThreadingHTTPServer):
+    """Local HTTP server answering /data/v2/histo* from a ReplaySession.
+
+    Use as a context manager; `url` is the base_url to hand to fetch_candles /
+    sync_candles (or to export as BTC_UTILS_API_URL).
+    """
+
+    daemon_threads = True
+
+    def __init__(self, replay, host='127.0.0.1', port=0):
+        super().__init__((host, port), _ReplayHandler)
+        self.replay = replay
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/data/v2"
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+        self._thread.join()
+
+
+class _ReplayHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, like the real API
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        status, payload = self.server.replay.respond(url.path.rstrip('/').rsplit('/', 1)[-1],
+                                                     dict(parse_qsl(url.query)))
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Record CryptoCompare candles or serve them back locally")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    record = commands.add_parser('record', help="download candles into a JSON fixture")
+    record.add_argument('out')
+    record.add_argument('--fsym', default='BTC')
+    record.add_argument('--tsym', default='USD')
+    record.add_argument('--granularity', choices=['day', 'hour', 'minute'], default='day')
+
+    serve = commands.add_parser('serve', help="emulate the histo* endpoints from a fixture")
+    serve.add_argument('--fixture', help="recorded candles (default: synthetic daily history)")
+    serve.add_argument('--port', type=int, default=8765)
+    serve.add_argument('--rate-limit-every', type=int, default=None,
+                       help="refuse every N-th request with a rate-limit error")
+    serve.add_argument('--latency', type=float, default=0.0, help="seconds added to each response")
+    args = parser.parse_args(argv)
+
+    if args.command == 'record':
+        import tempfile
+
+        from .data import make_session, sync_candles
+        from .store import PriceStore
+
+        session = RecordingSession(make_session())
+        with tempfile.TemporaryDirectory() as root:
+            sync_candles(args.fsym, args.tsym, PriceStore(root), session, granularity=args.granularity)
+        session.close()
+        session.save(args.out)
+        print(f"💾 {len(session.records())} candles saved to {args.out}")
+        return
+
+    if args.fixture:
+        records = load_fixture(args.fixture)
+    else:
+        today = int(time.time()) // DAY * DAY
+        records = synthetic_candles(6000, start_ts=today - 5999 * DAY)
+    replay = ReplaySession(records, args.rate_limit_every, args.latency)
+    with ReplayServer(replay, port=args.port) as server:
+        print(f"Serving {len(records)} candles on {server.url} (Ctrl+C to stop)")
+        print(f"export BTC_UTILS_API_URL={server.url}")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == '__main__':
+    main()
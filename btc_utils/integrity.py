@@ -0,0 +1,197 @@
+import argparse
+import json
+import os
+
+import numpy as np
+
+from . import metrics
+from .store import CANDLE_DTYPE, PriceStore
+
+DAY = 86400
+# A close this many times above/below both neighbours, which agree with each other, is a bad print
+SPIKE_FACTOR = 2.0
+
+# One row per change: candle open time, what was wrong, close (or high/low for 'ohlc') before and after
+REPAIR_DTYPE = np.dtype([('time', '<i8'), ('kind', 'U10'), ('before', '<f8'), ('after', '<f8')])
+KINDS = ('misaligned', 'trimmed', 'zero', 'gap', 'spike', 'ohlc')
+
+
+def _issues(kind, times, before, after):
+    issues = np.empty(len(times), dtype=REPAIR_DTYPE)
+    issues['time'], issues['kind'], issues['before'], issues['after'] = times, kind, before, after
+    return issues
+
+
+def _flat(records, rows, close):
+    """Turn `rows` into flat, volumeless candles at `close` (a carried-forward price)"""
+    for name in ('open', 'high', 'low', 'close'):
+        records[name][rows] = close
+    records['volumefrom'][rows] = 0
+    records['volumeto'][rows] = 0
+
+
+# ---------------------------- Repair ----------------------------
+def repair_candles(records, step=DAY, anchor=None, spike_factor=SPIKE_FACTOR):
+    """Check candles against the regular `step` grid and repair them in one vectorized pass.
+
+    - open times off the grid are floored onto it ('misaligned'; later copies win)
+    - leading candles without a positive close are dropped ('trimmed')
+    - zero, negative or non-finite closes carry the previous close forward ('zero')
+    - missing grid slots become flat candles at the previous close ('gap')
+    - a close `spike_factor` times away from both neighbours, which agree with
+      each other, is replaced by their geometric mean ('spike')
+    - high/low are widened to contain open and close ('ohlc')
+
+    `anchor` is the trusted stored candle just before `records`. It lets an
+    incremental sync check only the new rows and is not part of the output.
+    Returns (repaired records, REPAIR_DTYPE log of every change).
+    """
+    records = np.array(records, dtype=CANDLE_DTYPE)
+    log = []
+    if anchor is not None:
+        records = np.concatenate([np.array([anchor], dtype=CANDLE_DTYPE), records])
+    if not len(records):
+        return records, np.empty(0, dtype=REPAIR_DTYPE)
+
+    offset = records['time'] % step
+    if offset.any():
+        log.append(_issues('misaligned', records['time'][offset != 0], np.nan, np.nan))
+        records['time'] -= offset
+        records = records[np.argsort(records['time'], kind='stable')]
+        records = records[np.append(records['time'][1:] != records['time'][:-1], True)]
+
+    close = records['close']
+    valid = np.isfinite(close) & (close > 0)
+    if anchor is None:
+        first = int(np.argmax(valid)) if valid.any() else len(records)
+        log.append(_issues('trimmed', records['time'][:first], close[:first], np.nan))
+        records, valid = records[first:], valid[first:]
+    if not len(records):
+        return records, np.concatenate(log)
+
+    # Index of the last valid candle at or before each row, for carrying prices forward
+    positions = np.arange(len(records))
+    if not valid.all():
+        source = np.maximum.accumulate(np.where(valid, positions, 0))
+        rows = np.flatnonzero(~valid)
+        log.append(_issues('zero', records['time'][rows], records['close'][rows],
+                           records['close'][source[rows]]))
+        _flat(records, rows, records['close'][source[rows]])
+
+    slots = (records['time'] - records['time'][0]) // step
+    if slots[-1] + 1 > len(records):
+        grid = np.empty(slots[-1] + 1, dtype=CANDLE_DTYPE)
+        grid['time'] = records['time'][0] + step * np.arange(len(grid), dtype=np.int64)
+        present = np.zeros(len(grid), dtype=bool)
+        present[slots] = True
+        grid[slots] = records
+        source = np.maximum.accumulate(np.where(present, np.arange(len(grid)), 0))
+        rows = np.flatnonzero(~present)
+        log.append(_issues('gap', grid['time'][rows], np.nan, grid['close'][source[rows]]))
+        _flat(grid, rows, grid['close'][source[rows]])
+        records = grid
+
+    if len(records) > 2:
+        log_close = np.log(records['close'])
+        jump = np.diff(log_close)
+        limit = np.log(spike_factor)
+        spike = ((np.abs(jump[:-1]) > limit) & (np.abs(jump[1:]) > limit)
+                 & (np.sign(jump[:-1]) != np.sign(jump[1:]))
+                 & (np.abs(log_close[2:] - log_close[:-2]) < limit / 2))
+        rows = np.flatnonzero(spike) + 1
+        if len(rows):
+            repaired = np.exp((log_close[rows - 1] + log_close[rows + 1]) / 2)
+            log.append(_issues('spike', records['time'][rows], records['close'][rows], repaired))
+            records['close'][rows] = repaired
+
+    body = np.maximum(records['open'], records['close'])
+    high_rows = np.flatnonzero(~(records['high'] >= body))
+    log.append(_issues('ohlc', records['time'][high_rows], records['high'][high_rows], body[high_rows]))
+    records['high'][high_rows] = body[high_rows]
+    body = np.minimum(records['open'], records['close'])
+    low_rows = np.flatnonzero(~((records['low'] <= body) & (records['low'] > 0)))
+    log.append(_issues('ohlc', records['time'][low_rows], records['low'][low_rows], body[low_rows]))
+    records['low'][low_rows] = body[low_rows]
+
+    log = np.concatenate(log) if log else np.empty(0, dtype=REPAIR_DTYPE)
+    if anchor is not None:
+        records = records[1:]
+        log = log[log['time'] != anchor['time']]
+    log = log[np.argsort(log['time'], kind='stable')]
+    for kind in np.unique(log['kind']):
+        metrics.count('repairs', int((log['kind'] == kind).sum()), kind=str(kind))
+    return records, log
+
+
+# ---------------------------- Repair log ----------------------------
+def repairs_path(store, fsym, tsym, granularity='day'):
+    return os.path.splitext(store.path(fsym, tsym, granularity))[0] + '.repairs.jsonl'
+
+
+def log_repairs(store, fsym, tsym, log, granularity='day'):
+    """Append changes to the pair's repair log (JSON lines next to its candle file)"""
+    if not len(log):
+        return
+    os.makedirs(store.root, exist_ok=True)
+    with open(repairs_path(store, fsym, tsym, granularity), 'a') as f:
+        for time, kind, before, after in log.tolist():
+            f.write(json.dumps({'time': time, 'kind': kind,
+                                'before': None if np.isnan(before) else before,
+                                'after': None if np.isnan(after) else after}) + '\n')
+
+
+def load_repairs(store, fsym, tsym, granularity='day'):
+    """Every logged change, latest entry per (time, kind); a re-synced tail candle is logged again"""
+    path = repairs_path(store, fsym, tsym, granularity)
+    if not os.path.exists(path):
+        return np.empty(0, dtype=REPAIR_DTYPE)
+    with open(path) as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    latest = {(row['time'], row['kind']): row for row in rows}
+    return np.array([(time, kind, np.nan if row['before'] is None else row['before'],
+                      np.nan if row['after'] is None else row['after'])
+                     for (time, kind), row in sorted(latest.items())], dtype=REPAIR_DTYPE)
+
+
+def repair_store(store, fsym, tsym, granularity='day', step=DAY):
+    """Full rescan of a stored pair (for stores synced before the repair stage existed).
+
+    Bars derived from the candles (BarCache files) only re-aggregate their
+    tail, so they are dropped first and rebuilt from the repaired history on
+    their next use; the candle file itself is swapped in atomically.
+    """
+    records, log = repair_candles(np.array(store.load(fsym, tsym, granularity)), step)
+    if len(log):
+        for path in store.derived(fsym, tsym, granularity):
+            os.remove(path)
+        store.replace(fsym, tsym, records, granularity)
+        log_repairs(store, fsym, tsym, log, granularity)
+    return log
+
+
+def summarize(log):
+    return ', '.join(f"{(log['kind'] == kind).sum()} {kind}" for kind in KINDS if (log['kind'] == kind).any())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check and repair a stored pair against its candle grid")
+    parser.add_argument('pairs', nargs='*', default=['BTC-USD'], help="pairs like BTC-USD")
+    parser.add_argument('--granularity', choices=['day', 'hour', 'minute'], default='day')
+    parser.add_argument('--show', action='store_true', help="list the logged changes instead of rescanning")
+    args = parser.parse_args(argv)
+
+    from .data import GRANULARITIES
+
+    store = PriceStore()
+    for pair in args.pairs:
+        fsym, tsym = pair.split('-')
+        if args.show:
+            for time, kind, before, after in load_repairs(store, fsym, tsym, args.granularity).tolist():
+                print(f"{pair} {time} {kind:<10} {before:>14.6g} -> {after:<14.6g}")
+            continue
+        log = repair_store(store, fsym, tsym, args.granularity, GRANULARITIES[args.granularity][1])
+        print(f"🧹 {pair}: {summarize(log) or 'clean'}")
+
+
+if __name__ == '__main__':
+    main()
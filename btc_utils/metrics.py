@@ -0,0 +1,230 @@
+import atexit
+import functools
+import json
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+# Comma separated sink paths picked up on import: *.prom -> Prometheus text file, anything else -> JSON lines
+METRICS_ENV = 'BTC_UTILS_METRICS'
+PREFIX = 'btc_utils'
+FLUSH_SECONDS = 15  # Longest a Prometheus file lags behind its events in a long-running process
+
+_sinks = []
+_lock = threading.Lock()
+
+
+# ---------------------------- Emitting ----------------------------
+def enabled():
+    return bool(_sinks)
+
+
+def add_sink(sink):
+    with _lock:
+        _sinks.append(sink)
+    return sink
+
+
+def remove_sink(sink):
+    with _lock:
+        _sinks.remove(sink)
+
+
+def emit(event):
+    """Hand one event (a flat dict) to every sink"""
+    with _lock:
+        for sink in _sinks:
+            sink.write(event)
+
+
+def flush():
+    """Write out whatever buffering sinks (PrometheusSink) have aggregated so far"""
+    with _lock:
+        for sink in _sinks:
+            if hasattr(sink, 'flush'):
+                sink.flush()
+
+
+@contextmanager
+def stage(name, **labels):
+    """Time the enclosed block and emit it as a stage event.
+
+    The block gets the event dict and can add `rows` / `bytes` to it. With no
+    sink registered nothing is timed or emitted.
+    """
+    event = {'stage': name, **labels}
+    if not _sinks:
+        yield event
+        return
+
+    start = time.perf_counter()
+    try:
+        yield event
+    except BaseException as error:
+        event['error'] = type(error).__name__
+        raise
+    finally:
+        event['seconds'] = time.perf_counter() - start
+        event['time'] = time.time()
+        emit(event)
+
+
+def timed(name, **labels):
+    """Decorator form of stage() for functions with no rows/bytes to report"""
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with stage(name, **labels):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def count(name, value=1, **labels):
+    """Emit a counter increment, e.g. count('cache', result='hit', cache='store')"""
+    if _sinks:
+        emit({'counter': name, 'value': value, 'time': time.time(), **labels})
+
+
+@contextmanager
+def recording(*sinks):
+    """Register sinks for the duration of a block, flushing them on the way out"""
+    for sink in sinks:
+        add_sink(sink)
+    try:
+        yield sinks
+    finally:
+        for sink in sinks:
+            remove_sink(sink)
+            sink.close()
+
+
+# ---------------------------- Worker processes ----------------------------
+def forwarded(task):
+    """Wrap a process pool task so the events it emits travel back with its result.
+
+    Pool workers leave through os._exit, so sinks of their own are never
+    flushed; run the wrapped task and pass each result through replay() in the
+    parent instead. Returns `task` itself when nothing is recording.
+    """
+    return functools.partial(_collect, task) if _sinks else task
+
+
+def _collect(task, *args):
+    sink = MemorySink()
+    with _lock:
+        own, _sinks[:] = _sinks[:], [sink]
+    try:
+        result = task(*args)
+    finally:
+        with _lock:
+            _sinks[:] = own
+    return result, sink.events
+
+
+def replay(results, task):
+    """Results of a forwarded(task) map, re-emitting each worker's events in this process"""
+    if getattr(task, 'func', None) is not _collect:
+        yield from results
+        return
+    for result, events in results:
+        for event in events:
+            emit(event)
+        yield result
+
+
+# ---------------------------- Sinks ----------------------------
+class MemorySink:
+    """Keeps every event in a list (for tests and notebooks)"""
+
+    def __init__(self):
+        self.events = []
+
+    def write(self, event):
+        self.events.append(event)
+
+    def close(self):
+        pass
+
+
+class JsonLinesSink:
+    """Appends one JSON object per event to a file"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'a', buffering=1)
+
+    def write(self, event):
+        self._file.write(json.dumps(event, default=str) + '\n')
+
+    def close(self):
+        self._file.close()
+
+
+class PrometheusSink:
+    """Aggregates events into a Prometheus text file (node_exporter textfile collector format).
+
+    Stages become <prefix>_stage_seconds_sum/_count, <prefix>_stage_rows_total,
+    <prefix>_stage_bytes_total and <prefix>_stage_errors_total; counters become
+    <prefix>_<name>_total. The file is replaced atomically on flush/close, and
+    on write once `flush_seconds` have passed since the last flush.
+    """
+
+    def __init__(self, path, prefix=PREFIX, flush_seconds=FLUSH_SECONDS):
+        self.path = path
+        self.prefix = prefix
+        self.flush_seconds = flush_seconds
+        self.values = defaultdict(float)
+        self._flushed = time.monotonic()
+
+    def write(self, event):
+        if 'stage' in event:
+            labels = _labels(event, ('stage', 'seconds', 'time', 'rows', 'bytes', 'error'))
+            labels = (('stage', event['stage']),) + labels
+            self.values[('stage_seconds_sum', labels)] += event['seconds']
+            self.values[('stage_seconds_count', labels)] += 1
+            self.values[('stage_rows_total', labels)] += event.get('rows', 0)
+            self.values[('stage_bytes_total', labels)] += event.get('bytes', 0)
+            self.values[('stage_errors_total', labels)] += 'error' in event
+        else:
+            name = re.sub(r'\W', '_', event['counter'])
+            self.values[(f"{name}_total", _labels(event, ('counter', 'value', 'time')))] += event['value']
+        if time.monotonic() - self._flushed >= self.flush_seconds:
+            self.flush()
+
+    def flush(self):
+        self._flushed = time.monotonic()
+        lines = []
+        for (metric, labels), value in sorted(self.values.items()):
+            text = ','.join(f'{key}="{_escape(value)}"' for key, value in labels)
+            lines.append(f"{self.prefix}_{metric}{{{text}}} {value!r}")
+        tmp = f"{self.path}.tmp"
+        with open(tmp, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.replace(tmp, self.path)
+
+    def close(self):
+        self.flush()
+
+
+def _labels(event, skip):
+    return tuple(sorted((key, str(value)) for key, value in event.items() if key not in skip))
+
+
+def _escape(value):
+    return value.replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def sink_for(path):
+    return PrometheusSink(path) if path.endswith('.prom') else JsonLinesSink(path)
+
+
+def _from_environment():
+    for path in filter(None, os.environ.get(METRICS_ENV, '').split(',')):
+        atexit.register(add_sink(sink_for(path.strip())).close)
+
+
+_from_environment()
@@ -0,0 +1,76 @@
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from . import charts, metrics
+from .cycles import VIEWS, compute_cycle_rois
+from .risk import compute_risk_index
+
+CHARTS = (*VIEWS, 'risk')
+
+_prices = None  # Worker-side copy of the dataset, set once per process
+
+
+def render_chart(name, prices, paths, title_prefix="BTC"):
+    """Build one chart on the Agg canvas and write it to every path in `paths`"""
+    if name == 'risk':
+        btc = prices.to_frame('Close')
+        risk = compute_risk_index(prices, columns=['Risk_Index_Smooth'])
+        btc['Risk_Index_Smooth'] = risk['Risk_Index_Smooth']
+        fig = charts.plot_risk_index(btc, title=f"{title_prefix} Risk Index", headless=True)
+    else:
+        view = VIEWS[name]
+        fig = charts.plot_cycles(view, compute_cycle_rois(prices, view.anchors), headless=True)
+    return [charts.save_figure(fig, path) for path in paths]
+
+
+def _init_worker(prices):
+    global _prices
+    _prices = prices
+
+
+def _render_task(task):
+    name, paths, title_prefix = task
+    return render_chart(name, _prices, paths, title_prefix)
+
+
+def render_all(prices, out_dir, names=CHARTS, formats=('png',), workers=None, prefix="BTC-USD"):
+    """Render every requested chart in every format into `out_dir`, in parallel.
+
+    The price series is sent to each worker process once, at start-up, rather
+    than with every task. Returns the written paths.
+    """
+    title_prefix = prefix.split('-')[0]
+    tasks = [(name, [os.path.join(out_dir, f"{prefix}-{name}.{fmt}") for fmt in formats], title_prefix)
+             for name in names]
+
+    if workers == 1:
+        _init_worker(prices)
+        results = map(_render_task, tasks)
+        return [path for paths in results for path in paths]
+
+    task = metrics.forwarded(_render_task)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(prices,)) as pool:
+        return [path for paths in metrics.replay(pool.map(task, tasks), task) for path in paths]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render the charts to files without a display")
+    parser.add_argument('--out', default='charts', help="output folder")
+    parser.add_argument('--charts', nargs='+', choices=CHARTS, default=list(CHARTS))
+    parser.add_argument('--format', nargs='+', choices=charts.FORMATS, default=['png'], dest='formats')
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: one per CPU)")
+    args = parser.parse_args(argv)
+
+    from .data import get_crypto_data
+
+    print("Syncing BTC data from CryptoCompare...")
+    btc = get_crypto_data("2012-01-01", datetime.now().strftime("%Y-%m-%d"))
+
+    for path in render_all(btc['Close'], args.out, args.charts, args.formats, args.workers):
+        print(f"📊 {path}")
+
+
+if __name__ == '__main__':
+    main()
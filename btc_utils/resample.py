@@ -0,0 +1,91 @@
+import re
+
+import numpy as np
+
+from . import metrics
+from .store import CANDLE_DTYPE, PriceStore
+
+WEEK = 7 * 86400
+MONDAY_OFFSET = 4 * 86400  # 1970-01-01 was a Thursday
+UNITS = {'min': 60, 'h': 3600, 'd': 86400, 'w': WEEK}
+
+
+# ---------------------------- Bar boundaries ----------------------------
+def bar_starts(times, timeframe):
+    """Open time (unix seconds, UTC) of the bar each timestamp falls in.
+
+    `timeframe` is 'week' (Monday to Sunday), 'month' (calendar month) or a
+    fixed interval such as '15min', '4h' or '3d', aligned on the unix epoch.
+    """
+    times = np.asarray(times, dtype=np.int64)
+    if timeframe == 'week':
+        return (times - MONDAY_OFFSET) // WEEK * WEEK + MONDAY_OFFSET
+    if timeframe == 'month':
+        return times.astype('datetime64[s]').astype('datetime64[M]').astype('datetime64[s]').astype(np.int64)
+
+    match = re.fullmatch(r'(\d+)(min|h|d|w)', timeframe)
+    if match is None:
+        raise ValueError(f"Unknown timeframe {timeframe!r}, expected 'week', 'month' or e.g. '4h', '3d'")
+    interval = int(match.group(1)) * UNITS[match.group(2)]
+    return times // interval * interval
+
+
+def _groups(times, timeframe):
+    """(bar open times, index of the first row of each bar) for sorted timestamps"""
+    starts = bar_starts(times, timeframe)
+    first = np.flatnonzero(np.append(True, starts[1:] != starts[:-1]))
+    return starts[first], first
+
+
+def aggregate(records, timeframe):
+    """Candle records -> bars of `timeframe` (first open, max high, min low, last close, summed volumes)"""
+    records = np.asarray(records)
+    if len(records) == 0:
+        return np.empty(0, dtype=CANDLE_DTYPE)
+    starts, first = _groups(records['time'], timeframe)
+    last = np.append(first[1:], len(records)) - 1
+
+    bars = np.empty(len(starts), dtype=CANDLE_DTYPE)
+    bars['time'] = starts
+    bars['open'] = records['open'][first]
+    bars['high'] = np.maximum.reduceat(records['high'], first)
+    bars['low'] = np.minimum.reduceat(records['low'], first)
+    bars['close'] = records['close'][last]
+    bars['volumefrom'] = np.add.reduceat(records['volumefrom'], first)
+    bars['volumeto'] = np.add.reduceat(records['volumeto'], first)
+    return bars
+
+
+def resample_close(close, timeframe):
+    """Last close of each bar of a date-indexed Series, labelled by the bar open time"""
+    import pandas as pd
+
+    times = close.index.as_unit('s').asi8
+    starts, first = _groups(times, timeframe)
+    last = np.append(first[1:], len(times)) - 1
+    return pd.Series(close.to_numpy()[last], index=pd.to_datetime(starts, unit='s'), name=close.name)
+
+
+# ---------------------------- Cache ----------------------------
+class BarCache:
+    """Derived bars kept in the PriceStore next to the candles they come from.
+
+    Each call only re-aggregates the source candles from the newest cached bar
+    onwards (the one that may still be open) and rewrites that tail, so a
+    weekly or monthly view never resamples the full history twice.
+    """
+
+    def __init__(self, store=None):
+        self.store = store or PriceStore()
+
+    def bars(self, fsym, tsym, timeframe, source='day'):
+        """Up-to-date `timeframe` bars built from the stored `source` candles (memory-mapped)"""
+        name = f"{source}-{timeframe}"
+        candles = self.store.load(fsym, tsym, source)
+        last_bar = self.store.last_timestamp(fsym, tsym, name)
+        metrics.count('cache', cache='bars', result='miss' if last_bar is None else 'hit')
+
+        if last_bar is not None:
+            candles = candles[int(np.searchsorted(candles['time'], last_bar, side='left')):]
+        self.store.append(fsym, tsym, aggregate(candles, timeframe), name)
+        return self.store.load(fsym, tsym, name)
@@ -0,0 +1,396 @@
+import argparse
+from collections import deque
+from datetime import datetime, timezone
+
+import numpy as np
+
+from . import metrics
+
+WINDOW_DAYS = 730
+MIN_PERIODS = 180
+SMOOTH_DAYS = 7
+RISK_COLUMNS = ('Min_Rolling', 'Max_Rolling', 'Risk_Index', 'Risk_Index_Smooth')
+
+# ---------------------------- Risk buckets ----------------------------
+RISK_THRESHOLDS = [0.2, 0.4, 0.6, 0.8]
+RISK_LABELS = ["Very Low", "Low", "Medium", "High", "Very High"]
+RISK_EMOJIS = ['🟦', '🟩', '🟨', '🟧', '🟥']
+RISK_COLORS = ['#3b82f6', '#22c55e', '#eae308', '#f97316', '#ef4444']
+NO_BUCKET = -1  # bucket of a missing (NaN) risk
+NO_RISK_LABEL = "No data"
+
+
+def risk_bucket(risk):
+    """Bucket index 0-4 of a risk value (or array of values), 0 = Very Low; NO_BUCKET for NaN"""
+    bucket = np.searchsorted(RISK_THRESHOLDS, risk, side='right')
+    return np.where(np.isnan(risk), NO_BUCKET, bucket)
+
+
+def risk_label(risk):
+    """'🟦 Very Low' ... '🟥 Very High', or '⬜ No data' for NaN"""
+    bucket = int(risk_bucket(risk))
+    if bucket == NO_BUCKET:
+        return f"⬜ {NO_RISK_LABEL}"
+    return f"{RISK_EMOJIS[bucket]} {RISK_LABELS[bucket]}"
+
+
+# ---------------------------- Rolling extrema ----------------------------
+def _floats(values):
+    """values as a float array, keeping float32 inputs float32 instead of doubling them"""
+    values = np.asarray(values)
+    return values if values.dtype in (np.float32, np.float64) else values.astype(float)
+
+
+def _rolling_reduce(values, window, ufunc, fill):
+    """Trailing ufunc (maximum/minimum) over `window` points along the last axis.
+
+    van Herk/Gil-Werman: O(n) per series whatever the window.
+    """
+    n = values.shape[-1]
+    lead = values.shape[:-1]
+    pad = window - 1
+    blocks = -(-(pad + n) // window)
+    padded = np.full(lead + (blocks * window,), fill, dtype=values.dtype)
+    padded[..., pad:pad + n] = values
+    padded = padded.reshape(lead + (blocks, window))
+
+    prefix = ufunc.accumulate(padded, axis=-1).reshape(lead + (-1,))
+    suffix = ufunc.accumulate(padded[..., ::-1], axis=-1)[..., ::-1].reshape(lead + (-1,))
+
+    # The window ending at padded position j starts at j - pad: suffix covers
+    # its head block, prefix its tail block
+    return ufunc(suffix[..., :n], prefix[..., pad:pad + n])
+
+
+def _prepare(values, window, min_periods):
+    """NaN-free high/low inputs and the mask of positions with enough valid points"""
+    valid = ~np.isnan(values)
+    if valid.all():
+        counts = np.minimum(np.arange(1, values.shape[-1] + 1), window)
+        return values, values, np.broadcast_to(counts >= min_periods, values.shape)
+    cumulative = np.cumsum(valid, axis=-1)
+    counts = cumulative.copy()
+    counts[..., window:] -= cumulative[..., :-window]
+    return np.where(valid, values, -np.inf), np.where(valid, values, np.inf), counts >= min_periods
+
+
+def rolling_extrema(values, window, min_periods=None):
+    """Trailing rolling (min, max), matching pandas rolling(window, min_periods).
+
+    Works along the last axis, so a (symbols x dates) panel is one call. Cost is
+    linear in the number of points whatever the window. NaNs are skipped;
+    positions with fewer than `min_periods` valid points in their window are NaN.
+    float32 input gives float32 output.
+    """
+    values = _floats(values)
+    min_periods = window if min_periods is None else min(min_periods, window)
+    highs, lows, enough = _prepare(values, window, min_periods)
+
+    rolling_min = _rolling_reduce(lows, window, np.minimum, np.inf)
+    rolling_max = _rolling_reduce(highs, window, np.maximum, -np.inf)
+    rolling_min[~enough] = np.nan
+    rolling_max[~enough] = np.nan
+    return rolling_min, rolling_max
+
+
+def _doubling_levels(values, pad, ufunc, fill, levels):
+    """{k: trailing ufunc over 2**k points} for each k in `levels`, on a front-padded copy"""
+    table = np.full(pad + len(values), fill, dtype=values.dtype)
+    table[pad:] = values
+    kept = {}
+    for k in range(max(levels) + 1):
+        if k in levels:
+            kept[k] = table
+        if k < max(levels):
+            span = 1 << k
+            doubled = table.copy()
+            ufunc(table[span:], table[:-span], out=doubled[span:])
+            table = doubled
+    return kept
+
+
+def rolling_extrema_sweep(values, windows, min_periods=None):
+    """Yield (window, rolling_min, rolling_max) for many window lengths in one batch.
+
+    Trailing min/max over 2**k points are built once by doubling; any window w
+    is then the overlap of two such spans, ufunc(T_k[j], T_k[j - w + 2**k]) with
+    2**k <= w, so each extra window costs two contiguous slices.
+    """
+    values = _floats(values)
+    windows = list(windows)
+    pad = max(windows) - 1
+    levels = {int(w).bit_length() - 1 for w in windows}
+
+    valid = ~np.isnan(values)
+    highs = np.where(valid, values, -np.inf)
+    lows = np.where(valid, values, np.inf)
+    max_table = _doubling_levels(highs, pad, np.maximum, -np.inf, levels)
+    min_table = _doubling_levels(lows, pad, np.minimum, np.inf, levels)
+
+    n = len(values)
+    for window in windows:
+        k = int(window).bit_length() - 1
+        head = pad - window + (1 << k)
+        _, _, enough = _prepare(values, window, window if min_periods is None else min(min_periods, window))
+
+        rolling_min = np.minimum(min_table[k][pad:pad + n], min_table[k][head:head + n])
+        rolling_max = np.maximum(max_table[k][pad:pad + n], max_table[k][head:head + n])
+        rolling_min[~enough] = np.nan
+        rolling_max[~enough] = np.nan
+        yield window, rolling_min, rolling_max
+
+
+# ---------------------------- Risk Index ----------------------------
+def _finish_risk(risk, smooth_days):
+    """bfill, neutral fill, clip and centered mean along each row of a (k x dates) array.
+
+    Same result as pandas .bfill().fillna(0.5).clip(0, 1) followed by
+    .rolling(smooth_days, center=True, min_periods=1).mean(), series by series.
+    Results keep the dtype of `risk`; the running sum is accumulated in float64.
+    """
+    k, n = risk.shape
+    missing = np.isnan(risk)
+    filled = risk.copy()
+    if missing.any():
+        next_valid = np.where(missing, n, np.arange(n))
+        next_valid = np.minimum.accumulate(next_valid[:, ::-1], axis=1)[:, ::-1]
+        padded = np.hstack([risk, np.full((k, 1), 0.5, dtype=risk.dtype)])
+        filled = np.take_along_axis(padded, next_valid, axis=1)
+    np.clip(filled, 0, 1, out=filled)
+
+    # Centered window [i - smooth_days // 2, i - smooth_days // 2 + smooth_days), cut at the edges
+    cumulative = np.zeros((k, n + 1))
+    np.cumsum(filled, axis=1, out=cumulative[:, 1:])
+    start = np.arange(n) - smooth_days // 2
+    lo, hi = np.clip(start, 0, n), np.clip(start + smooth_days, 0, n)
+    smooth = cumulative[:, hi]
+    smooth -= cumulative[:, lo]
+    smooth /= hi - lo
+    return filled, smooth.astype(risk.dtype, copy=False)
+
+
+def risk_index_panel(closes, window_days=WINDOW_DAYS, min_periods=MIN_PERIODS,
+                     smooth_days=SMOOTH_DAYS):
+    """Risk_Index_Smooth for every row of a (symbols x dates) close array in one pass"""
+    closes = np.atleast_2d(_floats(closes))
+    rolling_min, rolling_max = rolling_extrema(closes, window_days, min_periods)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        risk_index = (closes - rolling_min) / (rolling_max - rolling_min)
+    return _finish_risk(risk_index, smooth_days)[1]
+
+
+def _trailing_smooth(risk, smooth_days):
+    """Mean of the valid values among the last `smooth_days` of each row; NaN where there are none.
+
+    Unlike _finish_risk nothing is backfilled and the window never looks ahead,
+    so each day only depends on closes up to that day.
+    """
+    valid = ~np.isnan(risk)
+    n = risk.shape[-1]
+    sums = np.zeros(risk.shape[:-1] + (n + 1,))
+    counts = np.zeros(risk.shape[:-1] + (n + 1,))
+    np.cumsum(np.where(valid, np.clip(risk, 0, 1), 0), axis=-1, out=sums[..., 1:])
+    np.cumsum(valid, axis=-1, out=counts[..., 1:])
+    lo = np.maximum(np.arange(1, n + 1) - smooth_days, 0)
+    count = counts[..., 1:] - counts[..., lo]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        smooth = (sums[..., 1:] - sums[..., lo]) / count
+    smooth[count == 0] = np.nan
+    return smooth.astype(risk.dtype, copy=False)
+
+
+def trailing_risk_panel(closes, window_days=WINDOW_DAYS, min_periods=MIN_PERIODS,
+                        smooth_days=SMOOTH_DAYS):
+    """risk_index_panel without look-ahead: trailing mean, no backfill, NaN until enough history.
+
+    This is the value that was known at each close, what a backtest has to trade on.
+    """
+    closes = np.atleast_2d(_floats(closes))
+    rolling_min, rolling_max = rolling_extrema(closes, window_days, min_periods)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        risk_index = (closes - rolling_min) / (rolling_max - rolling_min)
+    return _trailing_smooth(risk_index, smooth_days)
+
+
+def compute_risk_index(close, window_days=WINDOW_DAYS, min_periods=MIN_PERIODS,
+                       smooth_days=SMOOTH_DAYS, columns=RISK_COLUMNS):
+    """Position of each close inside its trailing min/max range (0 = at the low, 1 = at the high).
+
+    Only the requested `columns` are kept (e.g. just 'Risk_Index_Smooth' for a
+    chart); float32 closes give float32 columns.
+    """
+    import pandas as pd
+
+    with metrics.stage('risk_index', rows=len(close)):
+        values = _floats(close.to_numpy())
+        rolling_min, rolling_max = rolling_extrema(values, window_days, min_periods)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            risk_index = (values - rolling_min) / (rolling_max - rolling_min)
+        risk_index, smooth = _finish_risk(risk_index[None, :], smooth_days)
+
+    result = {
+        'Min_Rolling': rolling_min,
+        'Max_Rolling': rolling_max,
+        'Risk_Index': risk_index[0],
+        'Risk_Index_Smooth': smooth[0],
+    }
+    return pd.DataFrame({name: result[name] for name in columns}, index=close.index, copy=False)
+
+
+def risk_surface(close, windows, min_periods=MIN_PERIODS, smooth_days=SMOOTH_DAYS):
+    """Smoothed Risk Index for every window length: a DataFrame of dates x windows"""
+    import pandas as pd
+
+    windows = list(windows)
+    with metrics.stage('risk_surface', rows=len(close) * len(windows)):
+        values = _floats(close.to_numpy())
+        surface = np.empty((len(windows), len(values)), dtype=values.dtype)
+        sweep = rolling_extrema_sweep(values, windows, min_periods)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for k, (_, rolling_min, rolling_max) in enumerate(sweep):
+                surface[k] = (values - rolling_min) / (rolling_max - rolling_min)
+
+        _, smooth = _finish_risk(surface, smooth_days)
+    return pd.DataFrame(smooth.T, index=close.index, copy=False,
+                        columns=pd.Index(windows, name='window_days'))
+
+
+# ---------------------------- Live updates ----------------------------
+class RiskIndexState:
+    """Risk Index fed one close at a time, O(1) amortized per close.
+
+    Rolling min/max come from monotonic deques over the last `window_days`
+    closes. The smoothed value is what the batch centered mean gives on the
+    newest day: the mean of the last smooth_days // 2 + 1 risk values. There
+    is no future to backfill from, so a missing risk (not enough history, or a
+    flat window) counts as the neutral 0.5.
+    """
+
+    def __init__(self, window_days=WINDOW_DAYS, min_periods=MIN_PERIODS, smooth_days=SMOOTH_DAYS):
+        self.window_days = window_days
+        self.min_periods = min(min_periods, window_days)
+        self.position = -1
+        self.close = np.nan
+        self.risk = np.nan
+        self._lows = deque()   # (position, close), closes increasing
+        self._highs = deque()  # (position, close), closes decreasing
+        self._valid = deque(maxlen=window_days)
+        self._valid_count = 0
+        self._recent = deque(maxlen=smooth_days // 2 + 1)
+
+    @classmethod
+    def from_history(cls, closes, window_days=WINDOW_DAYS, min_periods=MIN_PERIODS,
+                     smooth_days=SMOOTH_DAYS):
+        """State after the given closes; only the tail that still matters is replayed"""
+        state = cls(window_days, min_periods, smooth_days)
+        closes = np.asarray(closes, dtype=float)
+        for close in closes[-(window_days + smooth_days):]:
+            state.update(close)
+        return state
+
+    def update(self, close):
+        """Add the next close and return the smoothed risk"""
+        self.position += 1
+        self.close = close
+        expired = self.position - self.window_days
+
+        valid = not np.isnan(close)
+        if len(self._valid) == self.window_days:
+            self._valid_count -= self._valid[0]
+        self._valid.append(valid)
+        self._valid_count += valid
+        if valid:
+            while self._lows and self._lows[-1][1] >= close:
+                self._lows.pop()
+            self._lows.append((self.position, close))
+            while self._highs and self._highs[-1][1] <= close:
+                self._highs.pop()
+            self._highs.append((self.position, close))
+        while self._lows and self._lows[0][0] <= expired:
+            self._lows.popleft()
+        while self._highs and self._highs[0][0] <= expired:
+            self._highs.popleft()
+
+        self.risk = np.nan
+        if valid and self._valid_count >= self.min_periods:
+            low, high = self._lows[0][1], self._highs[0][1]
+            if high > low:
+                self.risk = min(max((close - low) / (high - low), 0.0), 1.0)
+
+        self._recent.append(0.5 if np.isnan(self.risk) else self.risk)
+        return self.risk_smooth
+
+    @property
+    def risk_smooth(self):
+        return sum(self._recent) / len(self._recent) if self._recent else np.nan
+
+    @property
+    def bucket(self):
+        return int(risk_bucket(self.risk_smooth))
+
+    @property
+    def label(self):
+        return NO_RISK_LABEL if self.bucket == NO_BUCKET else RISK_LABELS[self.bucket]
+
+
+# ---------------------------- CLI ----------------------------
+def print_current(dates, closes, smooth):
+    """The "current data" summary of the Risk Index script"""
+    print(f"Risk Index range: {np.nanmin(smooth):.3f} - {np.nanmax(smooth):.3f}")
+    print(f"\n{'='*60}")
+    print(f"📊 Current data ({dates[-1].strftime('%d %b %Y')}):")
+    print(f"   BTC Price: ${closes[-1]:,.0f}")
+    print(f"   Risk Index: {smooth[-1]:.3f} ({smooth[-1]*100:.1f}%)")
+    print(f"   Level: {risk_label(smooth[-1])}")
+    print(f"{'='*60}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Current BTC Risk Index, optionally with its chart")
+    parser.add_argument('--chart', action='store_true', help="plot the Risk Index history")
+    parser.add_argument('--offline', action='store_true', help="use the stored candles without syncing")
+    parser.add_argument('--start', default="2013-01-01", help="first day of history (YYYY-MM-DD)")
+    parser.add_argument('--window', type=int, default=WINDOW_DAYS, help="rolling window in bars (days by default)")
+    parser.add_argument('--timeframe', default='day',
+                        help="bars to compute on: 'day', or 'week', 'month', '3d', ... from the cached bars")
+    args = parser.parse_args(argv)
+
+    from .data import DAY, cached_bars, get_candles, to_frame, to_timestamp
+    from .store import PriceStore
+
+    current_date = datetime.now().strftime("%Y-%m-%d")
+    store = PriceStore()
+    if args.offline:
+        candles = store.between('BTC', 'USD', to_timestamp(args.start),
+                                to_timestamp(current_date) + DAY - 1, 'day')
+    else:
+        print("Syncing BTC data from CryptoCompare...")
+        candles = get_candles(args.start, current_date, granularity='day', store=store)
+    if args.timeframe != 'day' and len(candles):
+        candles = cached_bars(store, 'BTC', 'USD', args.timeframe, args.start, current_date)
+    if not len(candles):
+        parser.error("no stored BTC-USD candles; run once without --offline")
+
+    dates = [datetime.fromtimestamp(int(ts), timezone.utc) for ts in candles['time'][[0, -1]]]
+    print(f"Data available from {dates[0].date()} to {dates[-1].date()}")
+    print(f"Total {args.timeframe} bars: {len(candles)}")
+    print("\nCalculating Risk Index...")
+
+    if not args.chart:
+        # numpy only: no pandas or matplotlib import on the cron path
+        closes = np.array(candles['close'])
+        print_current(dates, closes, risk_index_panel(closes, args.window)[0])
+        return
+
+    from . import charts
+
+    btc = to_frame(candles)
+    risk = compute_risk_index(btc['Close'], window_days=args.window, columns=['Risk_Index_Smooth'])
+    btc['Risk_Index_Smooth'] = risk['Risk_Index_Smooth']
+    print_current(dates, btc['Close'].to_numpy(), btc['Risk_Index_Smooth'].to_numpy())
+    charts.plot_risk_index(btc)
+    charts.show()
+
+
+if __name__ == '__main__':
+    main()
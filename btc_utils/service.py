@@ -0,0 +1,406 @@
+import argparse
+import asyncio
+import io
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+import numpy as np
+
+from . import metrics
+from .cycles import OUTLIER_SIGMA, OUTLIER_WINDOW, VIEWS
+from .risk import MIN_PERIODS, SMOOTH_DAYS, WINDOW_DAYS
+
+REFRESH_SECONDS = 3600
+CACHE_SIZE = 256
+WORKERS = 4
+HISTORY_START = "2012-01-01"
+DEFAULT_ASSETS = ('BTC-USD',)
+CHART_DPI = 100
+DPI_RANGE = (20, 300)  # bounds the canvas a query string can ask for
+FLAG_VALUES = {'1': True, 'true': True, 'yes': True, 'on': True,
+               '0': False, 'false': False, 'no': False, 'off': False, '': False}
+# Responses computed right after every refresh, so the usual dashboard queries never wait
+WARM_PATHS = ('/risk', '/chart/risk.png', *(f'/roi/{view}' for view in VIEWS),
+              *(f'/chart/{view}.png' for view in VIEWS))
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+# matplotlib style contexts switch the process-global rcParams, so charts are
+# built and drawn one at a time even though views run on a thread pool
+_CHART_LOCK = threading.Lock()
+
+
+def _floats(values):
+    """JSON-ready list, NaN -> null"""
+    values = np.asarray(values, dtype=float)
+    return np.where(np.isnan(values), None, np.round(values, 6)).tolist()
+
+
+def _float(value):
+    """JSON-ready scalar, NaN -> null"""
+    return _floats([value])[0]
+
+
+def _param(params, name, default, kind=int, low=1, high=None):
+    """Query parameter `name` as `kind`, rejected with a 400 unless low <= value <= high"""
+    raw = params.get(name, default)
+    try:
+        value = kind(raw)
+    except (TypeError, ValueError):
+        raise HTTPError(400, f"{name} must be a number, got {raw!r}") from None
+    if not np.isfinite(value) or value < low or (high is not None and value > high):
+        bounds = f"between {low} and {high}" if high is not None else f"at least {low}"
+        raise HTTPError(400, f"{name} must be {bounds}, got {raw!r}")
+    return value
+
+
+def _flag(params, name):
+    """Boolean query parameter: 1/true/yes/on or 0/false/no/off (absent = false), else a 400"""
+    raw = params.get(name, '')
+    if raw.lower() in FLAG_VALUES:
+        return FLAG_VALUES[raw.lower()]
+    raise HTTPError(400, f"{name} must be 1/true/yes/on or 0/false/no/off, got {raw!r}")
+
+
+def _dates(index):
+    return [date.strftime('%Y-%m-%d') for date in index]
+
+
+# ---------------------------- In-memory dataset ----------------------------
+class Dataset:
+    """Daily closes of a few pairs kept in memory and refreshed incrementally from the store.
+
+    `bars` holds the closes of the longer bars the overlays use ({(asset, timeframe): Series}),
+    read from the store's BarCache after each sync instead of regrouping the daily history.
+    """
+
+    def __init__(self, assets=DEFAULT_ASSETS, store=None, session=None, start_date=HISTORY_START):
+        self.assets = list(assets)
+        self.store = store
+        self.session = session
+        self.start_date = start_date
+        self.closes = {}
+        self.bars = {}
+        self.updated = None
+
+    def refresh(self):
+        """Sync every pair (only new candles are downloaded) and swap in the new series"""
+        from datetime import datetime
+
+        from .averages import OVERLAYS
+        from .data import cached_bars, get_crypto_data, to_frame
+        from .store import PriceStore
+
+        store = self.store or PriceStore()
+        end_date = datetime.now().strftime("%Y-%m-%d")
+        timeframes = {overlay.timeframe for overlay in OVERLAYS.values()} - {'day'}
+        closes, bars = {}, {}
+        for asset in self.assets:
+            fsym, tsym = asset.split('-')
+            closes[asset] = get_crypto_data(self.start_date, end_date, fsym, tsym, store,
+                                            self.session)['Close']
+            for timeframe in timeframes:
+                records = cached_bars(store, fsym, tsym, timeframe, self.start_date, end_date)
+                bars[asset, timeframe] = to_frame(records)['Close']
+        self.bars, self.closes = bars, closes  # bars first: new closes never meet old bars
+        self.updated = time.time()
+
+    def version(self, asset):
+        """Changes whenever the series of `asset` gets a new or revised last close"""
+        close = self.closes[asset]
+        return len(close), close.index[-1].value, float(close.iloc[-1])
+
+
+# ---------------------------- Views ----------------------------
+def risk_view(close, params):
+    from .risk import compute_risk_index, risk_label
+
+    window_days = _param(params, 'window_days', WINDOW_DAYS, high=len(close))
+    min_periods = _param(params, 'min_periods', MIN_PERIODS, high=len(close))
+    smooth_days = _param(params, 'smooth_days', SMOOTH_DAYS, high=len(close))
+    smooth = compute_risk_index(close, window_days, min_periods, smooth_days,
+                                columns=['Risk_Index_Smooth'])['Risk_Index_Smooth']
+    result = {
+        'date': close.index[-1].strftime('%Y-%m-%d'),
+        'price': _float(close.iloc[-1]),
+        'risk': _float(smooth.iloc[-1]),
+        'level': risk_label(smooth.iloc[-1]),
+        'params': {'window_days': window_days, 'min_periods': min_periods, 'smooth_days': smooth_days},
+    }
+    if _flag(params, 'series'):
+        result['series'] = {'dates': _dates(smooth.index), 'risk': _floats(smooth)}
+    return result
+
+
+def roi_view(close, params, view):
+    from .envelopes import analyze_cycles
+
+    window = _param(params, 'window', OUTLIER_WINDOW, high=len(close))
+    sigma = _param(params, 'sigma', OUTLIER_SIGMA, float, low=0.1)
+    analysis = analyze_cycles(close, VIEWS[view].anchors, window=window, sigma=sigma)
+    matrix = analysis.matrix
+    series = _flag(params, 'series')
+    result = {
+        'view': view,
+        'cycles': [{
+            'name': name,
+            'start': matrix.start[k].strftime('%Y-%m-%d'),
+            'end': matrix.end[k].strftime('%Y-%m-%d'),
+            'days': int(matrix.lengths[k] - 1),
+            'roi': _float(matrix.roi[k, matrix.lengths[k] - 1]),
+            'path': _floats(matrix.roi[k, :matrix.lengths[k]]) if series else None,
+        } for k, name in enumerate(matrix.names)],
+        'envelope': {
+            'median': _floats(analysis.envelope.median),
+            'mean': _floats(analysis.envelope.mean),
+            'bands': {str(q): _floats(band)
+                      for q, band in zip(analysis.envelope.quantiles, analysis.envelope.bands)},
+        },
+        'projection': None,
+    }
+    projection = analysis.projection
+    if projection is not None:
+        result['projection'] = {
+            'cycle': projection.name,
+            'day': int(projection.day),
+            'roi': _float(projection.roi),
+            'deviation': _float(projection.deviation[-1]),
+            'rank': _float(projection.rank[-1]),
+            'median_days_to_end': _float(projection.median_days_to_end),
+            'projected_end': None if projection.projected_end is None
+            else projection.projected_end.strftime('%Y-%m-%d'),
+            'path': _floats(projection.path),
+        }
+    return result
+
+
+def averages_view(close, params, name, bars):
+    from .averages import OVERLAYS, compute_overlay
+
+    if name not in OVERLAYS:
+        raise HTTPError(404, f"unknown overlay {name!r}")
+    timeframe = OVERLAYS[name].timeframe
+    if timeframe == 'day':
+        overlay = compute_overlay(close, name)
+    else:
+        overlay = compute_overlay(bars[timeframe], name, timeframe)
+    last = overlay.iloc[-1]
+    crosses = overlay.index[overlay['Cross'].to_numpy() != 0]
+    result = {
+        'overlay': name,
+        'date': overlay.index[-1].strftime('%Y-%m-%d'),
+        'values': {label: _float(last[label]) for label in OVERLAYS[name].averages},
+        'trend': int(last['Trend']) if not np.isnan(last['Trend']) else None,
+        'last_cross': None if not len(crosses) else {
+            'date': crosses[-1].strftime('%Y-%m-%d'),
+            'direction': 'golden' if overlay['Cross'].loc[crosses[-1]] > 0 else 'death',
+        },
+    }
+    if _flag(params, 'series'):
+        result['series'] = {'dates': _dates(overlay.index),
+                            **{label: _floats(overlay[label]) for label in OVERLAYS[name].averages}}
+    return result
+
+
+def chart_png(close, params, name, asset):
+    from . import charts
+    from .cycles import compute_cycle_rois
+    from .risk import compute_risk_index
+
+    dpi = _param(params, 'dpi', CHART_DPI, low=DPI_RANGE[0], high=DPI_RANGE[1])
+    if name == 'risk':
+        btc = close.to_frame('Close')
+        risk = compute_risk_index(close, columns=['Risk_Index_Smooth'])
+        btc['Risk_Index_Smooth'] = risk['Risk_Index_Smooth']
+        plot = partial(charts.plot_risk_index, btc, title=f"{asset.split('-')[0]} Risk Index", headless=True)
+    elif name in VIEWS:
+        cycles = compute_cycle_rois(close, VIEWS[name].anchors)
+        plot = partial(charts.plot_cycles, VIEWS[name], cycles, headless=True)
+    else:
+        raise HTTPError(404, f"unknown chart {name!r}")
+    buffer = io.BytesIO()
+    with _CHART_LOCK:
+        fig = plot()
+        fig.savefig(buffer, format='png', dpi=dpi, facecolor=fig.get_facecolor())
+    return buffer.getvalue()
+
+
+# ---------------------------- Service ----------------------------
+class Service:
+    """Routes requests to the views and caches their encoded responses.
+
+    The LRU is keyed by (view, asset, parameters, data version), so a refresh
+    that brings new closes makes old entries unreachable. Views run on a thread
+    pool; concurrent requests for the same key share one computation.
+    """
+
+    def __init__(self, dataset, cache_size=CACHE_SIZE, workers=WORKERS):
+        self.dataset = dataset
+        self.cache_size = cache_size
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self._cache = OrderedDict()
+        self.hits = self.misses = 0
+
+    def route(self, path, params):
+        """(key, function computing (content type, body)) of a request"""
+        parts = [unquote(part) for part in path.strip('/').split('/')]
+        asset = params.pop('asset', self.dataset.assets[0])
+        if asset not in self.dataset.closes:
+            raise HTTPError(404 if asset not in self.dataset.assets else 503, f"no data for {asset!r}")
+        close = self.dataset.closes[asset]
+        key = (tuple(parts), asset, tuple(sorted(params.items())), self.dataset.version(asset))
+
+        if parts == ['risk']:
+            return key, lambda: self._json(risk_view(close, params))
+        if len(parts) == 2 and parts[0] == 'roi' and parts[1] in VIEWS:
+            return key, lambda: self._json(roi_view(close, params, parts[1]))
+        if len(parts) == 2 and parts[0] == 'averages':
+            bars = {timeframe: series for (name, timeframe), series in self.dataset.bars.items()
+                    if name == asset}
+            return key, lambda: self._json(averages_view(close, params, parts[1], bars))
+        if len(parts) == 2 and parts[0] == 'chart' and parts[1].endswith('.png'):
+            return key, lambda: ('image/png', chart_png(close, params, parts[1][:-4], asset))
+        raise HTTPError(404, f"no such endpoint /{'/'.join(parts)}")
+
+    @staticmethod
+    def _json(payload):
+        return 'application/json', json.dumps(payload, allow_nan=False).encode()
+
+    async def get(self, path, params):
+        """(content type, body) for a GET, from the cache when possible"""
+        if path.strip('/') == 'health':
+            return self._json({
+                'status': 'ok',
+                'assets': {asset: close.index[-1].strftime('%Y-%m-%d')
+                           for asset, close in self.dataset.closes.items()},
+                'updated': self.dataset.updated,
+                'cache': {'size': len(self._cache), 'hits': self.hits, 'misses': self.misses},
+            })
+
+        key, compute = self.route(path, dict(params))
+        task = self._cache.get(key)
+        if task is not None:
+            self.hits += 1
+            metrics.count('cache', cache='service', result='hit')
+            self._cache.move_to_end(key)
+        else:
+            self.misses += 1
+            metrics.count('cache', cache='service', result='miss')
+            task = asyncio.get_running_loop().run_in_executor(self.executor, compute)
+            self._cache[key] = task
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        try:
+            return await task
+        except Exception:
+            if self._cache.get(key) is task:
+                del self._cache[key]
+            raise
+
+    async def refresh(self):
+        """Sync the dataset off the event loop, then warm the common responses"""
+        loop = asyncio.get_running_loop()
+        with metrics.stage('service_refresh', assets=len(self.dataset.assets)):
+            await loop.run_in_executor(self.executor, self.dataset.refresh)
+        await asyncio.gather(*(self.get(path, {'asset': asset})
+                               for asset in self.dataset.assets for path in WARM_PATHS),
+                             return_exceptions=True)
+
+    async def refresh_forever(self, interval=REFRESH_SECONDS):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.refresh()
+            except Exception as error:  # keep serving the previous data
+                print(f"⚠️  Refresh failed: {error!r}")
+            metrics.flush()  # a quiet server still publishes its latest counts
+
+    # ------------------------------ HTTP ------------------------------
+    async def handle(self, reader, writer):
+        """HTTP/1.1 with keep-alive: one GET after another on the same connection"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while (line := await reader.readline()) not in (b'\r\n', b'\n', b''):
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                method, target, version = (request_line.decode('latin-1').split() + ['', '', ''])[:3]
+                url = urlsplit(target)
+                try:
+                    if method != 'GET':
+                        raise HTTPError(405, "only GET is supported")
+                    content_type, body = await self.get(url.path, parse_qsl(url.query))
+                    status = 200
+                except HTTPError as error:
+                    status, content_type, body = error.status, *self._json({'error': str(error)})
+                except (ValueError, KeyError) as error:
+                    status, content_type, body = 400, *self._json({'error': repr(error)})
+                except Exception as error:
+                    status, content_type, body = 500, *self._json({'error': repr(error)})
+
+                # A rejected method may have sent a body that was never read: don't parse it as the next request
+                keep_alive = (version == 'HTTP/1.1' and status != 405
+                              and headers.get('connection', '').lower() != 'close')
+                writer.write(f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                             f"Content-Type: {content_type}\r\n"
+                             f"Content-Length: {len(body)}\r\n"
+                             f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode())
+                writer.write(body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host='127.0.0.1', port=8080, interval=REFRESH_SECONDS):
+        await self.refresh()
+        metrics.flush()
+        server = await asyncio.start_server(self.handle, host, port)
+        refresher = asyncio.create_task(self.refresh_forever(interval))
+        print(f"Serving {', '.join(self.dataset.assets)} on http://{host}:{port}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            refresher.cancel()
+            self.executor.shutdown(wait=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the analyses as JSON and PNG from memory")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--assets', nargs='+', default=list(DEFAULT_ASSETS), help="pairs like BTC-USD")
+    parser.add_argument('--refresh', type=float, default=REFRESH_SECONDS, help="seconds between syncs")
+    parser.add_argument('--cache-size', type=int, default=CACHE_SIZE)
+    parser.add_argument('--workers', type=int, default=WORKERS, help="threads computing responses")
+    args = parser.parse_args(argv)
+
+    service = Service(Dataset(args.assets), args.cache_size, args.workers)
+    try:
+        asyncio.run(service.serve(args.host, args.port, args.refresh))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
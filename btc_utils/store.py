@@ -0,0 +1,87 @@
+import glob
+import os
+
+import numpy as np
+
+# ---------------------------- Record layout ----------------------------
+# One fixed-width record per candle, keyed by the candle open time (unix seconds).
+# Files are plain arrays of these records, so they can be memory-mapped and sliced
+# by time without reading them whole.
+CANDLE_DTYPE = np.dtype([
+    ('time', '<i8'),
+    ('open', '<f8'),
+    ('high', '<f8'),
+    ('low', '<f8'),
+    ('close', '<f8'),
+    ('volumefrom', '<f8'),
+    ('volumeto', '<f8'),
+])
+
+DATA_DIR = os.environ.get(
+    'BTC_UTILS_DATA',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data'),
+)
+
+
+class PriceStore:
+    """Append-only on-disk candle store, one fixed-width binary file per pair and granularity"""
+
+    def __init__(self, root=DATA_DIR):
+        self.root = root
+
+    def path(self, fsym, tsym, granularity='day'):
+        return os.path.join(self.root, f"{fsym}-{tsym}-{granularity}.bin")
+
+    def load(self, fsym, tsym, granularity='day'):
+        """Every stored candle as a read-only memory-mapped structured array, sorted by time"""
+        path = self.path(fsym, tsym, granularity)
+        if not os.path.exists(path) or os.path.getsize(path) < CANDLE_DTYPE.itemsize:
+            return np.empty(0, dtype=CANDLE_DTYPE)
+        return np.memmap(path, dtype=CANDLE_DTYPE, mode='r')
+
+    def between(self, fsym, tsym, start_ts, end_ts, granularity='day'):
+        """Candles with open time in [start_ts, end_ts], still memory-mapped"""
+        records = self.load(fsym, tsym, granularity)
+        times = records['time']
+        lo = int(np.searchsorted(times, start_ts, side='left'))
+        hi = int(np.searchsorted(times, end_ts, side='right'))
+        return records[lo:hi]
+
+    def last_timestamp(self, fsym, tsym, granularity='day'):
+        """Open time of the newest stored candle, or None for an empty store"""
+        records = self.load(fsym, tsym, granularity)
+        return int(records['time'][-1]) if len(records) else None
+
+    def append(self, fsym, tsym, records, granularity='day'):
+        """Append candles, replacing any stored candle at or after the first new one.
+
+        The newest stored candle is usually the still-open current one, so every
+        sync rewrites the tail in place instead of the whole file.
+        """
+        if len(records) == 0:
+            return
+        os.makedirs(self.root, exist_ok=True)
+        path = self.path(fsym, tsym, granularity)
+        records = np.asarray(records, dtype=CANDLE_DTYPE)
+
+        stored = self.load(fsym, tsym, granularity)
+        keep = int(np.searchsorted(stored['time'], records['time'][0], side='left'))
+        size = len(stored)
+        del stored
+
+        with open(path, 'r+b' if os.path.exists(path) else 'wb') as f:
+            f.seek(keep * CANDLE_DTYPE.itemsize)
+            records.tofile(f)
+            if keep + len(records) < size:
+                f.truncate((keep + len(records)) * CANDLE_DTYPE.itemsize)
+
+    def replace(self, fsym, tsym, records, granularity='day'):
+        """Swap in a whole new candle file atomically: readers see the old or the new one, never a mix"""
+        os.makedirs(self.root, exist_ok=True)
+        path = self.path(fsym, tsym, granularity)
+        np.asarray(records, dtype=CANDLE_DTYPE).tofile(path + '.tmp')
+        os.replace(path + '.tmp', path)
+
+    def derived(self, fsym, tsym, granularity='day'):
+        """Paths of the bar files built from these candles (BarCache names them '<source>-<timeframe>')"""
+        return glob.glob(os.path.join(glob.escape(self.root), f"{fsym}-{tsym}-{granularity}-*.bin"))
@@ -0,0 +1,151 @@
+import argparse
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from . import metrics
+from .cycles import OUTLIER_SIGMA, OUTLIER_WINDOW, VIEWS, anchor_positions, roi_rows
+from .risk import (MIN_PERIODS, RISK_LABELS, SMOOTH_DAYS, WINDOW_DAYS, _finish_risk, risk_bucket,
+                   rolling_extrema)
+
+ROI_DAYS = (30, 90, 180, 365, 730)
+
+_values = None  # Worker-side view of the shared closes, set once per process
+_segment = None  # Keeps the worker's shared memory mapping open
+
+
+# ---------------------------- Shared prices ----------------------------
+def _attach(name, shape, dtype):
+    """Worker initializer: map the parent's shared closes instead of receiving a copy"""
+    global _segment, _values
+    _segment = shared_memory.SharedMemory(name=name)
+    _values = np.ndarray(shape, dtype=dtype, buffer=_segment.buf)
+
+
+def _run(values, task, tasks, workers):
+    """Results of task(*args) for each args in `tasks`, with `values` shared by every worker"""
+    global _values
+    if workers == 1:
+        _values = values
+        return [task(*args) for args in tasks]
+
+    segment = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+    try:
+        np.ndarray(values.shape, dtype=values.dtype, buffer=segment.buf)[...] = values
+        task = metrics.forwarded(task)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_attach,
+                                 initargs=(segment.name, values.shape, values.dtype)) as pool:
+            return list(metrics.replay(pool.map(task, *zip(*tasks)), task))
+    finally:
+        segment.close()
+        segment.unlink()
+
+
+# ---------------------------- Risk Index sweep ----------------------------
+def _risk_task(window_days, min_periods, smooth_days):
+    """Days in each risk bucket for one window/min_periods and every smoothing length"""
+    rolling_min, rolling_max = rolling_extrema(_values, window_days, min_periods)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        risk = (_values - rolling_min) / (rolling_max - rolling_min)
+    rows = []
+    for smooth in smooth_days:
+        _, risk_smooth = _finish_risk(risk[None, :], smooth)
+        counts = np.bincount(risk_bucket(risk_smooth[0]), minlength=len(RISK_LABELS))
+        rows.append((window_days, min_periods, smooth, counts, risk_smooth[0, -1]))
+    return rows
+
+
+def risk_sweep(close, window_days=(WINDOW_DAYS,), min_periods=(MIN_PERIODS,),
+               smooth_days=(SMOOTH_DAYS,), workers=None):
+    """Time spent in each risk bucket for every parameter combination, as a tidy table.
+
+    One row per (window_days, min_periods, smooth_days, bucket) with the number
+    and share of days in that bucket, plus the latest smoothed risk of the
+    combination. Combinations run in parallel; the closes are placed in shared
+    memory once rather than pickled to each worker.
+    """
+    import pandas as pd
+
+    values = np.ascontiguousarray(close, dtype=float)
+    tasks = [(w, m, list(smooth_days)) for w, m in itertools.product(window_days, min_periods)]
+    rows = []
+    for result in _run(values, _risk_task, tasks, workers):
+        for window, periods, smooth, counts, current in result:
+            for bucket, days in enumerate(counts):
+                share = days / len(values)
+                rows.append((window, periods, smooth, RISK_LABELS[bucket], days, share, current))
+    return pd.DataFrame(rows, columns=['window_days', 'min_periods', 'smooth_days', 'bucket',
+                                       'days', 'share', 'current'])
+
+
+# ---------------------------- ROI sweep ----------------------------
+def _roi_task(window, sigma, start_pos, end_pos, days):
+    lengths, roi = roi_rows(_values, start_pos, end_pos, window, sigma)
+    at = np.full((len(lengths), len(days)), np.nan)
+    for j, day in enumerate(days):
+        reached = lengths > day
+        at[reached, j] = roi[reached, day]
+    return window, sigma, at, roi[np.arange(len(lengths)), lengths - 1]
+
+
+def roi_sweep(prices, anchors, windows=(OUTLIER_WINDOW,), sigmas=(OUTLIER_SIGMA,), days=ROI_DAYS,
+              workers=None):
+    """Per-cycle ROI at day N for every outlier filter window/sigma, as a tidy table.
+
+    One row per (window, sigma, cycle, day); day -1 holds the ROI at the end
+    anchor. ROI is NaN for days a cycle has not reached.
+    """
+    import pandas as pd
+
+    names, start_pos, end_pos = anchor_positions(prices.index, anchors)
+    values = np.ascontiguousarray(prices, dtype=float)
+    days = list(days)
+    tasks = [(w, s, start_pos, end_pos, days) for w, s in itertools.product(windows, sigmas)]
+    rows = []
+    for window, sigma, at, final in _run(values, _roi_task, tasks, workers):
+        for k, name in enumerate(names):
+            rows += [(window, sigma, name, day, at[k, j]) for j, day in enumerate(days)]
+            rows.append((window, sigma, name, -1, final[k]))
+    return pd.DataFrame(rows, columns=['window', 'sigma', 'cycle', 'day', 'roi'])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluate Risk Index / ROI parameter grids on all cores")
+    parser.add_argument('kind', choices=['risk', *VIEWS])
+    parser.add_argument('--window-days', nargs='+', type=int, default=[365, 730, 1095, 1460])
+    parser.add_argument('--min-periods', nargs='+', type=int, default=[MIN_PERIODS])
+    parser.add_argument('--smooth-days', nargs='+', type=int, default=[1, SMOOTH_DAYS, 14, 30])
+    parser.add_argument('--window', nargs='+', type=int, default=[3, OUTLIER_WINDOW, 9],
+                        help="outlier filter windows (ROI views)")
+    parser.add_argument('--sigma', nargs='+', type=float, default=[2, OUTLIER_SIGMA, 4],
+                        help="outlier filter sigmas (ROI views)")
+    parser.add_argument('--day', nargs='+', type=int, default=list(ROI_DAYS), help="ROI checkpoints (ROI views)")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument('--out', help="write the table to this CSV file")
+    args = parser.parse_args(argv)
+
+    from .data import get_crypto_data
+
+    print("Syncing BTC data from CryptoCompare...")
+    start = "2013-01-01" if args.kind == 'risk' else "2012-01-01"
+    close = get_crypto_data(start, datetime.now().strftime("%Y-%m-%d"))['Close']
+
+    if args.kind == 'risk':
+        table = risk_sweep(close, args.window_days, args.min_periods, args.smooth_days, args.workers)
+    else:
+        table = roi_sweep(close, VIEWS[args.kind].anchors, args.window, args.sigma, args.day, args.workers)
+
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        table.to_csv(args.out, index=False)
+        print(f"💾 {len(table)} rows saved to {args.out}")
+    else:
+        print(table.to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
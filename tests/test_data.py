@@ -0,0 +1,43 @@
+import time
+
+import numpy as np
+
+from btc_utils.data import DAY, sync_candles
+from btc_utils.fixtures import ReplaySession, synthetic_candles
+from btc_utils.store import PriceStore
+
+
+def recent_candles(n):
+    """Synthetic daily candles whose last one is today's, as a sync fetches up to now"""
+    today = int(time.time()) // DAY * DAY
+    return synthetic_candles(n, start_ts=today - (n - 1) * DAY)
+
+
+def test_cold_sync_stores_full_history(tmp_path):
+    records = recent_candles(3000)
+    stored = sync_candles(store=PriceStore(tmp_path), session=ReplaySession(records))
+    np.testing.assert_array_equal(stored, records)
+
+
+def test_warm_sync_fetches_only_new_candles(tmp_path):
+    records = recent_candles(3000)
+    store = PriceStore(tmp_path)
+    sync_candles(store=store, session=ReplaySession(records[:-3]))
+
+    session = ReplaySession(records)
+    stored = sync_candles(store=store, session=session)
+    assert session.calls == 1
+    np.testing.assert_array_equal(stored, records)
+
+
+def test_warm_sync_rewrites_the_open_candle(tmp_path):
+    records = recent_candles(100)
+    store = PriceStore(tmp_path)
+    sync_candles(store=store, session=ReplaySession(records))
+
+    revised = records.copy()
+    revised['close'][-1] *= 1.01
+    revised['high'][-1] = max(revised['high'][-1], revised['close'][-1])
+    stored = sync_candles(store=store, session=ReplaySession(revised))
+    assert len(stored) == len(records)
+    np.testing.assert_array_equal(stored, revised)
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from btc_utils.filters import HAS_NUMBA, despike
+
+ENGINES = ['numpy', pytest.param('numba', marks=pytest.mark.skipif(not HAS_NUMBA, reason="numba not installed"))]
+
+
+def baseline_despike(values, window=5, sigma=3):
+    """The pandas recipe of the original ROI scripts"""
+    values = pd.Series(values, dtype=float)
+    rolling_median = values.rolling(window=window, center=True, min_periods=1).median()
+    rolling_std = values.rolling(window=window, center=True, min_periods=1).std()
+    values[np.abs(values - rolling_median) > sigma * rolling_std] = np.nan
+    return values.interpolate(method='linear').to_numpy()
+
+
+def spiky(n, seed=0):
+    rng = np.random.default_rng(seed)
+    values = np.cumsum(rng.normal(0, 0.02, n)) + 1
+    spikes = rng.choice(n, n // 50, replace=False)
+    values[spikes] *= rng.choice([0.2, 5.0], len(spikes))
+    return values
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+@pytest.mark.parametrize('window, sigma', [(5, 3), (9, 2), (7, 1.5)])
+def test_matches_pandas_recipe(engine, window, sigma):
+    values = spiky(2000)
+    np.testing.assert_allclose(despike(values, window, sigma, engine), baseline_despike(values, window, sigma))
+
+
+def test_spikes_are_replaced():
+    # One point in a window of w is at most (w - 1) / sqrt(w) stds away, so the 5/3 default never fires
+    values = spiky(2000)
+    assert (despike(values, 9, 2, 'numpy') != values).sum() >= 2000 // 50
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_rows_skip_nan_padding(engine):
+    lengths = [2000, 1500, 300]
+    matrix = np.full((len(lengths), max(lengths)), np.nan)
+    for row, length in enumerate(lengths):
+        matrix[row, :length] = spiky(length, seed=row)
+
+    result = despike(matrix, window=7, sigma=2, engine=engine)
+    for row, length in enumerate(lengths):
+        np.testing.assert_allclose(result[row, :length], baseline_despike(matrix[row, :length], 7, 2))
+        assert np.isnan(result[row, length:]).all()
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_every_point_flagged(engine):
+    values = np.array([1.0, 2.0])
+    np.testing.assert_array_equal(despike(values, sigma=0.1, engine=engine), baseline_despike(values, sigma=0.1))
@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+
+from btc_utils.fixtures import synthetic_candles
+from btc_utils.risk import compute_risk_index
+
+
+def baseline_risk_index(close, window_days=730, min_periods=180, smooth_days=7):
+    """The pandas recipe of the original Risk Index script"""
+    btc = pd.DataFrame({'Close': close})
+    btc['Min_Rolling'] = btc['Close'].rolling(window=window_days, min_periods=min_periods).min()
+    btc['Max_Rolling'] = btc['Close'].rolling(window=window_days, min_periods=min_periods).max()
+    btc['Risk_Index'] = (btc['Close'] - btc['Min_Rolling']) / (btc['Max_Rolling'] - btc['Min_Rolling'])
+    btc['Risk_Index'] = btc['Risk_Index'].bfill().fillna(0.5)
+    btc['Risk_Index'] = btc['Risk_Index'].clip(0, 1)
+    btc['Risk_Index_Smooth'] = btc['Risk_Index'].rolling(window=smooth_days, center=True, min_periods=1).mean()
+    return btc.drop(columns='Close')
+
+
+def closes(n):
+    records = synthetic_candles(n)
+    return pd.Series(records['close'], index=pd.to_datetime(records['time'], unit='s'), name='Close')
+
+
+def test_matches_pandas_recipe():
+    close = closes(3000)
+    pd.testing.assert_frame_equal(compute_risk_index(close), baseline_risk_index(close))
+
+
+def test_matches_pandas_recipe_with_other_windows():
+    close = closes(1000)
+    pd.testing.assert_frame_equal(compute_risk_index(close, 365, 30, 14), baseline_risk_index(close, 365, 30, 14))
+
+
+def test_history_shorter_than_min_periods_is_neutral():
+    risk = compute_risk_index(closes(100))
+    assert risk['Min_Rolling'].isna().all()
+    np.testing.assert_allclose(risk['Risk_Index_Smooth'], 0.5)